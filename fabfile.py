@@ -98,8 +98,9 @@ def deploy(verbosity='normal'):
     """
     Full server deploy.
 
-    Updates the repository (server-side), synchronizes the database, collects
-    static files and then restarts the web service.
+    Updates the repository (server-side), checks the templates compile,
+    collects static files, synchronizes the database and then restarts the
+    web service.
     """
     if verbosity == 'noisy':
         hide_args = []
@@ -108,6 +109,8 @@ def deploy(verbosity='normal'):
     with hide(*hide_args):
         puts('Updating repository...')
         execute(update)
+        puts('Checking templates...')
+        execute(precompile_templates)
         puts('Collecting static files...')
         execute(collectstatic)
         puts('Synchronizing database...')
@@ -151,13 +154,24 @@ def update(action='check'):
         requirements()
 
 
+@task
+@roles('web')
+def precompile_templates():
+    """
+    Compile all templates, failing on syntax errors.
+    """
+    dj('precompile_templates')
+
+
 @task
 @roles('web')
 def collectstatic():
     """
-    Collect static files from apps and other locations in a single location.
+    Collect static files from apps and other locations in a single location
+    and compress the changed compress blocks.
     """
     dj('collectstatic --link --noinput')
+    dj('compress_parallel')
     with cd('{virtualenv_dir}/var/static'.format(**env)):
         fix_permissions()
 
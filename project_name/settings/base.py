@@ -59,6 +59,7 @@ LANGUAGES = (
 INSTALLED_APPS = (
     # Local Apps
     # '{{ project_name }}.apps.',
+    '{{ project_name }}.utils',
 
     # Third Party Apps
     'south',
@@ -79,6 +80,14 @@ INSTALLED_APPS = (
     'django.contrib.admindocs',
 )
 
+# Apps only needed during development. The profile_imports command warns when
+# they are imported with DEBUG = False.
+DEV_ONLY_APPS = (
+    'django_nose',
+    'debug_toolbar',
+    'django.contrib.admindocs',
+)
+
 
 #==============================================================================
 # Project URLS and media settings
@@ -104,6 +113,10 @@ STATICFILES_FINDERS += (
     'compressor.finders.CompressorFinder',
 )
 
+# Write copies of the collected files named after their contents, which
+# browsers can cache forever, and gzip and brotli copies for the web server.
+STATICFILES_STORAGE = '{{ project_name }}.utils.storage.HashedStaticFilesStorage'
+
 #==============================================================================
 # Templates
 #==============================================================================
@@ -112,19 +125,37 @@ TEMPLATE_DIRS = (
     os.path.join(PROJECT_DIR, 'templates'),
 )
 
+# Compile each template once per process instead of on every render.
+TEMPLATE_LOADERS = (
+    ('django.template.loaders.cached.Loader', (
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    )),
+)
+
 TEMPLATE_CONTEXT_PROCESSORS += (
     'django.core.context_processors.request',
 )
 
+# Identifies the release, so fragments cached by the previous one aren't used.
+from {{ project_name }}.utils.version import git_revision
+DEPLOY_VERSION = git_revision(PROJECT_ROOT) or ''
+
+# The cache and default timeout of the cachefragment template tag, a timeout
+# of 0 turns fragment caching off.
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 300
+
 #==============================================================================
 # Middleware
 #==============================================================================
 
 MIDDLEWARE_CLASSES = (
     '{{ project_name }}.utils.middleware.request_id.RequestIdMiddleware',
+    '{{ project_name }}.utils.middleware.timing.TimingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.transaction.TransactionMiddleware',
+    '{{ project_name }}.utils.middleware.transaction.SelectiveTransactionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -162,6 +193,75 @@ PASSWORD_HASHERS = (
 
 TEST_RUNNER = 'django_nose.NoseTestSuiteRunner'
 
+#==============================================================================
+# Database settings
+#==============================================================================
+
+# Send the reads of read-only requests to the REPLICA_DATABASES.
+DATABASE_ROUTERS = (
+    '{{ project_name }}.utils.db.routers.ReplicaRouter',
+)
+
+# Aliases in DATABASES that are read-only replicas of the default database.
+REPLICA_DATABASES = ()
+
+# Stop reading from a replica while it's more than this many seconds behind.
+REPLICA_MAX_LAG = 10
+
+# Seconds between checks of the lag of each replica, in each process.
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+# Seconds the reads of a browser go to the primary after it wrote something.
+REPLICA_PIN_SECONDS = 5
+
+# Regular expressions of paths whose GET requests run in a transaction.
+TRANSACTIONAL_URLS = ()
+
+#==============================================================================
+# Cache settings
+#==============================================================================
+
+# Keep hot keys in each process in front of Redis. Redis database 0 is used
+# by Celery.
+CACHES = {
+    'default': {
+        'BACKEND': '{{ project_name }}.utils.cache.TieredCache',
+        'OPTIONS': {
+            'REMOTE': 'redis',
+            'LOCAL_PREFIXES': ('fragment:',),
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'VERSION_CHECK_INTERVAL': 1,
+        },
+    },
+    'redis': {
+        'BACKEND': '{{ project_name }}.utils.cache.RedisCache',
+        'LOCATION': 'localhost:6379',
+        'KEY_PREFIX': '{{ project_name }}',
+        'OPTIONS': {
+            'DB': 1,
+        },
+    },
+}
+
+#==============================================================================
+# Session settings
+#==============================================================================
+
+# Write-through cached sessions that skip writes when nothing changed.
+SESSION_ENGINE = '{{ project_name }}.utils.sessions'
+
+# Sessions bypass the in-process cache so they are never stale.
+SESSION_CACHE_ALIAS = 'redis'
+
+#==============================================================================
+# Waffle settings
+#==============================================================================
+
+# Seconds each process uses its copy of the flags, switches and samples
+# before checking whether they changed.
+WAFFLE_SNAPSHOT_TIMEOUT = 10
+
 #==============================================================================
 # Email settings
 #==============================================================================
@@ -180,7 +280,7 @@ EMAIL_SUBJECT_PREFIX = '[Django - {{ project_name }}] '
 
 COMPRESS_PARSER = 'compressor.parser.LxmlParser'
 
-COMPRESS_STORAGE = 'compressor.storage.GzipCompressorFileStorage'
+COMPRESS_STORAGE = '{{ project_name }}.utils.compress.PrecompressedCompressorFileStorage'
 
 COMPRESS_OFFLINE = True
 
@@ -195,11 +295,18 @@ COMPRESS_CSS_HASHING_METHOD = 'content'
 COMPRESS_DATA_URI_MAX_SIZE = 30 * 1024  # 30KB
 
 COMPRESS_JS_FILTERS = (
-    'compressor.filters.closure.ClosureCompilerFilter',
+    '{{ project_name }}.utils.compress.ClosureCompilerFilter',
 )
 
-COMPRESS_CLOSURE_COMPILER_BINARY = 'java -jar %s' % os.path.join(
-    BIN_ROOT, 'closure_compiler.jar')
+COMPRESS_CLOSURE_COMPILER_JAR = os.path.join(BIN_ROOT, 'closure_compiler.jar')
+
+COMPRESS_CLOSURE_COMPILER_BINARY = 'java -jar %s' % COMPRESS_CLOSURE_COMPILER_JAR
+
+# compress_parallel runs Closure Compiler in one nailgun server when these
+# are installed, instead of starting a JVM for every block.
+COMPRESS_NAILGUN_JAR = os.path.join(BIN_ROOT, 'nailgun.jar')
+
+COMPRESS_NAILGUN_CLIENT = os.path.join(BIN_ROOT, 'ng')
 
 #==============================================================================
 # Celery settings
@@ -212,6 +319,37 @@ CELERY_TIMEZONE = TIME_ZONE
 
 CELERYD_HIJACK_ROOT_LOGGER = False
 
+#==============================================================================
+# Logging settings
+#==============================================================================
+
+# Use the request ID sent by the load balancer in the REQUEST_ID_HEADER.
+REQUEST_ID_TRUST_HEADER = False
+
+# The request headers included when a request is logged, None includes all.
+LOG_REQUEST_HEADERS = (
+    'HTTP_HOST',
+    'HTTP_USER_AGENT',
+    'HTTP_REFERER',
+    'HTTP_ACCEPT_LANGUAGE',
+    'HTTP_X_FORWARDED_FOR',
+)
+
+# Profile this fraction of requests with cProfile, 0 turns profiling off.
+REQUEST_PROFILE_RATE = 0
+
+# Keep the profiles of this many of the slowest requests in each process.
+REQUEST_PROFILE_KEEP = 10
+
+REQUEST_PROFILE_DIR = os.path.join(VAR_ROOT, 'log', 'profiles')
+
+# Send the request timings to the browser in a Server-Timing header.
+SERVER_TIMING_HEADER = True
+
+# Import the URLconf and compile the templates when wsgi.py is loaded, before
+# the worker serves its first request, and log how long it took.
+WSGI_WARMUP = False
+
 #==============================================================================
 # Miscellaneous project settings
 #==============================================================================
@@ -4,7 +4,10 @@ from django.conf import settings
 
 from django.contrib import admin
 
+from {{ project_name }}.utils import waffle
+
 admin.autodiscover()
+waffle.install()
 
 urlpatterns = patterns('',
     # url(r'', include('{{ project_name }}.apps.')),
@@ -0,0 +1,358 @@
+from __future__ import absolute_import
+
+import time
+import threading
+import cPickle as pickle
+from collections import OrderedDict
+
+from django.core.cache import get_cache
+from django.core.cache.backends.base import BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+_missing = object()
+
+
+class RedisCache(BaseCache):
+    """
+    A Django cache backend that stores values in Redis using redis-py.
+
+    LOCATION is either 'host:port' or 'unix:/path/to/redis.sock'. The
+    database and password can be set with the DB and PASSWORD options.
+
+    Integers are stored as they are so `incr` and `decr` are atomic,
+    everything else is pickled. Like memcached a timeout of 0 means the
+    value never expires.
+    """
+    def __init__(self, server, params):
+        super(RedisCache, self).__init__(params)
+        if redis is None:
+            raise ImproperlyConfigured('RedisCache requires the redis package.')
+
+        options = params.get('OPTIONS', {})
+        kwargs = {
+            'db': int(options.get('DB', 0)),
+            'password': options.get('PASSWORD', None),
+        }
+        if server.startswith('unix:'):
+            kwargs['unix_socket_path'] = server[5:]
+        else:
+            host, _, port = (server or 'localhost').partition(':')
+            kwargs['host'] = host
+            kwargs['port'] = int(port or 6379)
+        self.client = redis.StrictRedis(**kwargs)
+
+    def key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def timeout(self, timeout):
+        if timeout is None:
+            return self.default_timeout
+        return int(timeout)
+
+    def dumps(self, value):
+        if isinstance(value, (int, long)) and not isinstance(value, bool):
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def add(self, key, value, timeout=None, version=None):
+        timeout = self.timeout(timeout)
+        # One SET NX EX, so the key can't be left without its timeout.
+        return bool(self.client.set(self.key(key, version), self.dumps(value),
+            ex=timeout if timeout > 0 else None, nx=True))
+
+    def get(self, key, default=None, version=None):
+        value = self.client.get(self.key(key, version))
+        if value is None:
+            return default
+        return self.loads(value)
+
+    def _set(self, client, key, value, timeout):
+        timeout = self.timeout(timeout)
+        if timeout > 0:
+            client.setex(key, timeout, self.dumps(value))
+        else:
+            client.set(key, self.dumps(value))
+
+    def set(self, key, value, timeout=None, version=None):
+        self._set(self.client, self.key(key, version), value, timeout)
+
+    def delete(self, key, version=None):
+        self.client.delete(self.key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.key(key, version) for key in keys])
+        return dict((key, self.loads(value))
+            for key, value in zip(keys, values) if value is not None)
+
+    def has_key(self, key, version=None):
+        return self.client.exists(self.key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.key(key, version)
+        if not self.client.exists(key):
+            raise ValueError("Key '%s' not found" % key)
+        try:
+            return self.client.incr(key, delta)
+        except redis.ResponseError:
+            raise ValueError("Key '%s' is not an integer" % key)
+
+    def set_many(self, data, timeout=None, version=None):
+        pipeline = self.client.pipeline()
+        for key, value in data.iteritems():
+            self._set(pipeline, self.key(key, version), value, timeout)
+        pipeline.execute()
+
+    def delete_many(self, keys, version=None):
+        keys = [self.key(key, version) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        """Delete the keys with this cache's KEY_PREFIX, or everything if there is none."""
+        if self.key_prefix:
+            keys = self.client.keys('%s*' % self.key_prefix)
+            if keys:
+                self.client.delete(*keys)
+        else:
+            self.client.flushdb()
+
+
+class TieredCache(BaseCache):
+    """
+    Keeps recently used values in a small in-process cache in front of
+    another cache, so hot keys don't need a network round trip.
+
+    The REMOTE option is the alias of the cache in CACHES that holds the
+    data, all the other settings like KEY_PREFIX belong on that cache.
+
+    Only the keys starting with one of the LOCAL_PREFIXES are kept in the
+    local cache, pick prefixes of keys that are read far more often than
+    they are written. Every other key goes straight to the remote cache.
+
+    The local cache is a least recently used cache of MAX_ENTRIES values,
+    each kept for at most LOCAL_TIMEOUT seconds. Values are kept pickled
+    and unpickled on every get, so callers can't change the cached copy.
+
+    Each of the LOCAL_PREFIXES has a version key in the remote cache that
+    writes to its keys through any process increment. Every
+    VERSION_CHECK_INTERVAL seconds each process fetches the version keys
+    and throws away the local values of the prefixes whose version changed.
+    A value changed by another process can be stale for up to
+    VERSION_CHECK_INTERVAL seconds, and up to LOCAL_TIMEOUT seconds when the
+    value is changed in the remote cache directly.
+    """
+    version_key = 'tiered-cache-version:%s'
+    # The remote cache needs to keep the version keys around, memcached
+    # doesn't allow longer timeouts than 30 days.
+    version_key_timeout = 30 * 24 * 60 * 60
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = params['OPTIONS'] = dict(params.get('OPTIONS', {}))
+        options.setdefault('MAX_ENTRIES', 1000)
+        super(TieredCache, self).__init__(params)
+
+        self.remote_alias = options.get('REMOTE', location)
+        if not self.remote_alias:
+            raise ImproperlyConfigured('TieredCache needs the alias of the remote cache in the REMOTE option.')
+        self.local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.version_check_interval = float(options.get('VERSION_CHECK_INTERVAL', 1))
+
+        self._remote = None
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._checked = 0
+
+    @property
+    def remote(self):
+        if self._remote is None:
+            self._remote = get_cache(self.remote_alias)
+        return self._remote
+
+    def local_prefix(self, key):
+        """Returns the first of the LOCAL_PREFIXES `key` starts with, or None."""
+        for prefix in self.local_prefixes:
+            if key.startswith(prefix):
+                return prefix
+        return None
+
+    def forget_prefix(self, prefix):
+        """Throw away the local values whose keys belong to `prefix`."""
+        with self._lock:
+            for key in [key for key in self._local if self.local_prefix(key[0]) == prefix]:
+                del self._local[key]
+
+    def check_version(self):
+        """Throw away the local values of the prefixes other processes wrote to."""
+        now = time.time()
+        if not self.local_prefixes or now - self._checked < self.version_check_interval:
+            return
+        self._checked = now
+
+        keys = dict((self.version_key % prefix, prefix) for prefix in self.local_prefixes)
+        versions = self.remote.get_many(keys.keys())
+        for key, prefix in keys.iteritems():
+            version = versions.get(key)
+            if version != self._versions.get(prefix):
+                self.forget_prefix(prefix)
+                self._versions[prefix] = version
+
+    def bump_version(self, prefix):
+        """Tell the other processes to throw away their local values of `prefix`."""
+        key = self.version_key % prefix
+        try:
+            version = self.remote.incr(key)
+        except ValueError:
+            # The version key was evicted or cleared. Start from the time
+            # rather than 1 so processes that saw the old version notice.
+            version = int(time.time() * 1000)
+            if not self.remote.add(key, version, self.version_key_timeout):
+                version = self.remote.incr(key)
+
+        # Only keep the local values if nobody else wrote in the meantime.
+        previous = self._versions.get(prefix)
+        if previous is None or version != previous + 1:
+            self.forget_prefix(prefix)
+        self._versions[prefix] = version
+
+    def written(self, keys, version):
+        """Bump the versions of the prefixes `keys` belong to, returns the local keys."""
+        prefixes = set(self.local_prefix(key) for key in keys)
+        prefixes.discard(None)
+        for prefix in prefixes:
+            self.bump_version(prefix)
+        return [key for key in keys if self.local_prefix(key) is not None]
+
+    def local_key(self, key, version):
+        return key, self.version if version is None else version
+
+    def local_get(self, key, version):
+        key = self.local_key(key, version)
+        with self._lock:
+            entry = self._local.pop(key, None)
+            if entry is None:
+                return _missing
+            expires, data = entry
+            if expires < time.time():
+                return _missing
+            self._local[key] = entry
+        return pickle.loads(data)
+
+    def local_set(self, key, value, version, timeout=None):
+        timeout = self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+        if timeout <= 0:
+            return self.local_delete(key, version)
+
+        key = self.local_key(key, version)
+        entry = time.time() + timeout, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local.pop(key, None)
+            self._local[key] = entry
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def local_delete(self, key, version):
+        with self._lock:
+            self._local.pop(self.local_key(key, version), None)
+
+    def add(self, key, value, timeout=None, version=None):
+        added = self.remote.add(key, value, timeout, version)
+        if added and self.written([key], version):
+            self.local_set(key, value, version, timeout)
+        return added
+
+    def get(self, key, default=None, version=None):
+        if self.local_prefix(key) is None:
+            return self.remote.get(key, default, version)
+
+        self.check_version()
+        value = self.local_get(key, version)
+        if value is _missing:
+            value = self.remote.get(key, _missing, version)
+            if value is _missing:
+                return default
+            self.local_set(key, value, version)
+        return value
+
+    def set(self, key, value, timeout=None, version=None):
+        self.remote.set(key, value, timeout, version)
+        if self.written([key], version):
+            self.local_set(key, value, version, timeout)
+
+    def delete(self, key, version=None):
+        self.remote.delete(key, version)
+        if self.written([key], version):
+            self.local_delete(key, version)
+
+    def get_many(self, keys, version=None):
+        self.check_version()
+        found, missing = {}, []
+        for key in keys:
+            value = _missing
+            if self.local_prefix(key) is not None:
+                value = self.local_get(key, version)
+            if value is _missing:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if missing:
+            fetched = self.remote.get_many(missing, version)
+            for key, value in fetched.iteritems():
+                if self.local_prefix(key) is not None:
+                    self.local_set(key, value, version)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version) is not _missing
+
+    def incr(self, key, delta=1, version=None):
+        value = self.remote.incr(key, delta, version)
+        if self.written([key], version):
+            self.local_delete(key, version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version)
+
+    def set_many(self, data, timeout=None, version=None):
+        self.remote.set_many(data, timeout, version)
+        for key in self.written(list(data), version):
+            self.local_set(key, data[key], version, timeout)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.remote.delete_many(keys, version)
+        for key in self.written(keys, version):
+            self.local_delete(key, version)
+
+    def clear(self):
+        keys = [self.version_key % prefix for prefix in self.local_prefixes]
+        versions = self.remote.get_many(keys)
+        self.remote.clear()
+        with self._lock:
+            self._local.clear()
+        # Carry the version keys over the clear so they still change.
+        for prefix, key in zip(self.local_prefixes, keys):
+            self._versions[prefix] = (versions.get(key) or 0) + 1
+            self.remote.set(key, self._versions[prefix], self.version_key_timeout)
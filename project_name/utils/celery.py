@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+from .middleware.request_id import get_request_id, set_request_id
+
+try:
+    from celery import Task
+except ImportError:
+    Task = None
+
+
+# The keyword argument the request ID is sent to the worker in.
+REQUEST_ID_KWARG = '_request_id'
+
+
+class RequestIdMixin(object):
+    """
+    Sends the ID of the current request along with the task when it's
+    queued, and makes it the current request ID inside the worker while the
+    task runs. Log records from the task then have the same `request_id` as
+    the request that queued it.
+
+    The ID travels in the task's keyword arguments, since Celery 3.0 doesn't
+    hand message headers to the task. It's removed again before the task
+    runs. Tasks that run eagerly are run by the thread handling the request,
+    those keep the current request ID.
+    """
+    def apply_async(self, args=None, kwargs=None, **options):
+        request_id = get_request_id()
+        if request_id:
+            kwargs = dict(kwargs or {})
+            kwargs.setdefault(REQUEST_ID_KWARG, request_id)
+        return super(RequestIdMixin, self).apply_async(args, kwargs, **options)
+
+    def __call__(self, *args, **kwargs):
+        previous = get_request_id()
+        set_request_id(kwargs.pop(REQUEST_ID_KWARG, None) or previous)
+        try:
+            return super(RequestIdMixin, self).__call__(*args, **kwargs)
+        finally:
+            set_request_id(previous)
+
+
+if Task is not None:
+    class RequestIdTask(RequestIdMixin, Task):
+        """The base class of the project's tasks, see RequestIdMixin."""
+        abstract = True
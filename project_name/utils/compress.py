@@ -0,0 +1,247 @@
+"""
+Helpers for Django Compressor: a cache of what each compress block was
+built from for the compress_parallel command, a Closure Compiler filter that
+can run in one long-lived JVM and a storage that writes pre-compressed
+copies of the compressed files.
+"""
+from __future__ import absolute_import
+
+import os
+import re
+import json
+import time
+import socket
+import hashlib
+import subprocess
+
+from django.conf import settings
+import compressor
+from compressor.base import SOURCE_FILE
+from compressor.filters.closure import ClosureCompilerFilter as BaseClosureCompilerFilter
+from compressor.storage import CompressorFileStorage
+
+from .storage import precompress, has_variants, should_precompress
+
+
+# The port of the nailgun server started by NailgunServer in this process,
+# inherited by the processes compressing blocks in parallel.
+_nailgun_port = None
+
+
+class ClosureCompilerFilter(BaseClosureCompilerFilter):
+    """
+    Runs Closure Compiler through the nailgun server started by
+    compress_parallel while it runs, instead of starting a JVM for every
+    block. Otherwise it runs COMPRESS_CLOSURE_COMPILER_BINARY like
+    Compressor's filter.
+    """
+    def __init__(self, *args, **kwargs):
+        super(ClosureCompilerFilter, self).__init__(*args, **kwargs)
+        if _nailgun_port is not None:
+            binary = '%s --nailgun-port %d com.google.javascript.jscomp.CommandLineRunner' % (
+                settings.COMPRESS_NAILGUN_CLIENT, _nailgun_port)
+            self.options = tuple(dict(self.options, binary=binary).items())
+
+
+class NailgunServer(object):
+    """
+    Keeps one JVM with Closure Compiler loaded running, so compressing each
+    block only costs a call to the nailgun client. Used as a context manager.
+    """
+    main_class = 'com.martiansoftware.nailgun.NGServer'
+
+    def __init__(self, port=2113, timeout=30):
+        self.port = port
+        self.timeout = timeout
+        self.process = None
+
+    @classmethod
+    def available(cls):
+        """Returns True if the nailgun server and client are installed."""
+        paths = [getattr(settings, name, None) for name in ('COMPRESS_NAILGUN_JAR',
+            'COMPRESS_NAILGUN_CLIENT', 'COMPRESS_CLOSURE_COMPILER_JAR')]
+        return all(path and os.path.exists(path) for path in paths)
+
+    def start(self):
+        global _nailgun_port
+        classpath = os.pathsep.join((settings.COMPRESS_NAILGUN_JAR,
+            settings.COMPRESS_CLOSURE_COMPILER_JAR))
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(['java', '-cp', classpath, self.main_class,
+                '127.0.0.1:%d' % self.port], stdout=devnull)
+
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), 1).close()
+                break
+            except socket.error:
+                if self.process.poll() is not None or time.time() > deadline:
+                    self.stop()
+                    raise RuntimeError('The nailgun server did not start.')
+                time.sleep(0.1)
+        _nailgun_port = self.port
+
+    def stop(self):
+        global _nailgun_port
+        _nailgun_port = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        self.process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def settings_hash():
+    """
+    Returns a hash of the settings that change the output of a block, so
+    changing a filter rebuilds everything.
+    """
+    return hashlib.md5(repr((
+        getattr(compressor, '__version__', None),
+        settings.COMPRESS_URL,
+        settings.COMPRESS_CSS_FILTERS,
+        settings.COMPRESS_JS_FILTERS,
+        getattr(settings, 'COMPRESS_CLOSURE_COMPILER_ARGUMENTS', None),
+        getattr(settings, 'COMPRESS_DATA_URI_MAX_SIZE', None),
+    ))).hexdigest()
+
+
+css_url = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)""")
+
+
+def css_references(content, directory=None):
+    """
+    Returns the paths of the local files the url()s in the CSS `content`
+    point to, relative URLs are resolved from `directory` when it's given.
+    """
+    paths = set()
+    for url in css_url.findall(content):
+        url = url.split('#', 1)[0].split('?', 1)[0]
+        if url.startswith(settings.COMPRESS_URL):
+            path = os.path.join(settings.COMPRESS_ROOT, url[len(settings.COMPRESS_URL):])
+        elif url.startswith(('data:', 'http:', 'https:', '/')) or directory is None:
+            continue
+        else:
+            path = os.path.join(directory, url)
+        paths.add(os.path.normpath(path))
+    return sorted(paths)
+
+
+def source_hash(compressor):
+    """
+    Returns a hash of the markup of a compress block and the contents of the
+    files it links to, or None if a file can't be read.
+
+    For CSS it also covers the files the url()s point to, since the filters
+    inline small images and add the hash of the others to their URLs.
+    """
+    digest = hashlib.md5(settings_hash())
+    digest.update(compressor.content.encode('utf-8'))
+    references = []
+    try:
+        for kind, value, basename, elem in compressor.split_contents():
+            if kind == SOURCE_FILE:
+                with open(value, 'rb') as f:
+                    content = f.read()
+                directory = os.path.dirname(value)
+            else:
+                content = value.encode('utf-8')
+                directory = None
+            digest.update(content)
+            if compressor.type == 'css':
+                references.extend(css_references(content, directory))
+    except Exception:
+        return None
+
+    for path in references:
+        digest.update(path)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+output_url = re.compile(r'(?:href|src)="([^"]+)"')
+
+
+def outputs_exist(result):
+    """Returns True if the compressed files a block's result links to still exist."""
+    for url in output_url.findall(result):
+        if not url.startswith(settings.COMPRESS_URL):
+            continue
+        path = os.path.join(settings.COMPRESS_ROOT, url[len(settings.COMPRESS_URL):])
+        if not os.path.exists(path.split('?', 1)[0]):
+            return False
+    return True
+
+
+class SourcesManifest(object):
+    """
+    Maps the offline key of each compress block to the hash of its sources
+    and the result it was compressed to, kept next to Compressor's own
+    manifest between deploys.
+    """
+    filename = 'sources.json'
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(settings.COMPRESS_ROOT, settings.COMPRESS_OUTPUT_DIR,
+                self.filename)
+        self.path = path
+        self.entries = {}
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (IOError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.entries, f)
+        os.rename(self.path + '.tmp', self.path)
+
+    def get(self, key, sources):
+        """Returns the previous result of the block if its sources are the same."""
+        entry = self.entries.get(key)
+        if sources is None or entry is None or entry['sources'] != sources:
+            return None
+        if not outputs_exist(entry['result']):
+            return None
+        return entry['result']
+
+    def set(self, key, sources, result):
+        if sources is not None:
+            self.entries[key] = {'sources': sources, 'result': result}
+
+    def retain(self, keys):
+        """Forgets the blocks that aren't in `keys` anymore."""
+        self.entries = dict((key, entry) for key, entry in self.entries.items()
+            if key in keys)
+
+
+class PrecompressedCompressorFileStorage(CompressorFileStorage):
+    """
+    Writes gzip and brotli copies next to each file Compressor saves, like
+    GzipCompressorFileStorage does with gzip, see PrecompressedMixin. The
+    names of compressed files change with their contents, so files that
+    already have their copies are left alone.
+    """
+    def _save(self, filename, content):
+        filename = super(PrecompressedCompressorFileStorage, self)._save(filename, content)
+        path = self.path(filename)
+        if should_precompress(filename) and not has_variants(path):
+            precompress(path)
+        return filename
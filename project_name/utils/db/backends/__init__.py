@@ -0,0 +1,5 @@
+"""
+Database backends that keep their connection open between requests. Use
+them as the ENGINE in DATABASES, see
+{{ project_name }}.utils.db.persistent.PersistentConnectionMixin.
+"""
@@ -0,0 +1,10 @@
+from __future__ import absolute_import
+
+from django.db.backends.postgresql_psycopg2 import base
+from django.db.backends.postgresql_psycopg2.base import *   # pylint: disable=W0614,W0401
+
+from ...persistent import PersistentConnectionMixin
+
+
+class DatabaseWrapper(PersistentConnectionMixin, base.DatabaseWrapper):
+    pass
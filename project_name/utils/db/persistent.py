@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+
+from django.core import signals
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class PersistentConnectionMixin(object):
+    """
+    Keeps the database connection open between requests instead of closing
+    it when each request finishes, so requests don't pay for connecting.
+
+    Each thread keeps its own connection, so a WSGI worker with N threads
+    holds at most N connections per database. Two keys in the DATABASES
+    entry control it:
+
+    CONN_MAX_AGE - Seconds to keep a connection for. 0 closes it at the end
+        of every request, like Django does, and None keeps it forever.
+        Defaults to 0.
+    CONN_HEALTH_CHECKS - Run a cheap query before the first use of a kept
+        connection in each request and reconnect if it fails, instead of
+        the request failing on a connection the database server dropped.
+        Defaults to False.
+
+    Any transaction left open is rolled back when a request finishes. A
+    connection inherited from a parent process is never used, the child
+    opens its own.
+    """
+    def __init__(self, *args, **kwargs):
+        super(PersistentConnectionMixin, self).__init__(*args, **kwargs)
+        self.max_age = self.settings_dict.get('CONN_MAX_AGE', 0)
+        self.health_checks = self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        self.connection_pid = None
+        self.close_at = None
+        self.health_check_needed = False
+
+    def _cursor(self):
+        if self.connection is not None:
+            if self.connection_pid != os.getpid():
+                # Closing the parent's connection would close it for the
+                # parent too, just forget about it.
+                self.connection = None
+            elif self.health_check_needed:
+                self.health_check_needed = False
+                if not self.is_usable():
+                    self.close_quietly()
+
+        new_connection = self.connection is None
+        cursor = super(PersistentConnectionMixin, self)._cursor()
+        if new_connection:
+            self.connection_pid = os.getpid()
+            if self.max_age is None:
+                self.close_at = None
+            else:
+                self.close_at = time.time() + self.max_age
+        return cursor
+
+    def is_usable(self):
+        """Returns True if the connection still works."""
+        try:
+            self.connection.cursor().execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def close_quietly(self):
+        """Close the connection, ignoring errors from connections that are already broken."""
+        try:
+            self.close()
+        except Exception:
+            self.connection = None
+
+    def close_if_unusable_or_obsolete(self):
+        """
+        Called when a request finishes. Closes the connection if it's older
+        than CONN_MAX_AGE or broken, otherwise ends any open transaction and
+        keeps it for the next request.
+        """
+        if self.connection is None:
+            return
+
+        if self.connection_pid != os.getpid():
+            self.connection = None
+            return
+
+        if self.close_at is not None and time.time() >= self.close_at:
+            self.close_quietly()
+            return
+
+        try:
+            self.connection.rollback()
+        except Exception:
+            logger.warning('Closing a database connection that failed to roll back.', exc_info=True)
+            self.close_quietly()
+            return
+
+        self.health_check_needed = self.health_checks
+
+
+def close_old_connections(**kwargs):
+    """
+    Replaces Django's close_connection at the end of each request. Keeps the
+    connections of persistent backends and closes the others.
+    """
+    for conn in connections.all():
+        if isinstance(conn, PersistentConnectionMixin):
+            conn.close_if_unusable_or_obsolete()
+        else:
+            conn.close()
+
+
+def replace_close_connection(**kwargs):
+    """
+    Swaps Django's close_connection for close_old_connections when the first
+    request starts. This module is imported by django.db while it loads the
+    backend, before close_connection exists and is connected.
+    """
+    from django.db import close_connection
+    signals.request_finished.disconnect(close_connection)
+    signals.request_finished.connect(close_old_connections,
+        dispatch_uid='persistent.close_old_connections')
+    signals.request_started.disconnect(replace_close_connection,
+        dispatch_uid='persistent.replace_close_connection')
+
+
+signals.request_started.connect(replace_close_connection,
+    dispatch_uid='persistent.replace_close_connection')
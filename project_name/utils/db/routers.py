@@ -0,0 +1,145 @@
+import time
+import random
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionDoesNotExist
+
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Maps replica aliases to (time checked, lag in seconds or None if the
+# check failed).
+_lag = {}
+
+# Returns the seconds the replica is behind the primary, by vendor.
+LAG_QUERIES = {
+    # Replaying the last received WAL record counts as no lag, otherwise an
+    # idle primary would look like growing lag.
+    'postgresql': '''
+        SELECT CASE
+            WHEN pg_last_xlog_receive_location() = pg_last_xlog_replay_location() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END''',
+}
+
+
+def get_replica():
+    """
+    Returns the alias of the replica reads go to in the current thread, or
+    None when they go to the primary.
+    """
+    return getattr(_local, 'replica', None)
+
+
+def use_replica(alias):
+    """Send reads in the current thread to the replica `alias`, or the primary for None."""
+    _local.replica = alias
+    _local.wrote = False
+
+
+def did_write():
+    """Returns True if anything was written since the last call to use_replica."""
+    return getattr(_local, 'wrote', False)
+
+
+def measure_lag(alias):
+    """
+    Returns how many seconds the replica `alias` is behind the primary, or
+    None if it can't be reached or isn't in DATABASES. Databases we can't
+    measure count as 0.
+    """
+    try:
+        connection = connections[alias]
+    except ConnectionDoesNotExist:
+        logger.warning('Replica %s is not in DATABASES.', alias)
+        return None
+    if connection.vendor == 'mysql':
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        except Exception:
+            logger.warning('Could not measure the lag of replica %s.', alias, exc_info=True)
+            return None
+        if row is None:
+            return 0
+        return dict(zip(columns, row)).get('Seconds_Behind_Master')
+
+    sql = LAG_QUERIES.get(connection.vendor)
+    if sql is None:
+        return 0
+    try:
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        lag = cursor.fetchone()[0]
+    except Exception:
+        logger.warning('Could not measure the lag of replica %s.', alias, exc_info=True)
+        return None
+    return float(lag or 0)
+
+
+def replica_lag(alias):
+    """
+    Returns the lag of the replica `alias`, measured at most once every
+    REPLICA_LAG_CHECK_INTERVAL seconds per process.
+    """
+    now = time.time()
+    checked, lag = _lag.get(alias, (0, None))
+    if now - checked >= getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5):
+        lag = measure_lag(alias)
+        _lag[alias] = now, lag
+    return lag
+
+
+def pick_replica():
+    """
+    Returns one of the REPLICA_DATABASES at random, leaving out replicas
+    that are more than REPLICA_MAX_LAG seconds behind the primary or can't
+    be reached. Returns None if there are none left.
+    """
+    replicas = getattr(settings, 'REPLICA_DATABASES', ())
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', None)
+    if max_lag is not None:
+        lags = [(alias, replica_lag(alias)) for alias in replicas]
+        replicas = [alias for alias, lag in lags if lag is not None and lag <= max_lag]
+    if not replicas:
+        return None
+    return random.choice(replicas)
+
+
+class ReplicaRouter(object):
+    """
+    Sends reads to the replica picked for the current request by
+    SelectiveTransactionMiddleware, and everything else to the primary.
+
+    Reads only go to a replica during read-only requests. Once anything is
+    written during the request the rest of its reads go to the primary too,
+    so they see the write. SelectiveTransactionMiddleware then keeps the
+    reads of the same browser on the primary for REPLICA_PIN_SECONDS, so
+    the pages after a form post don't show data from before the post.
+    """
+    def db_for_read(self, model, **hints):
+        if getattr(_local, 'wrote', False):
+            return DEFAULT_DB_ALIAS
+        return get_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """The replicas hold the same data as the primary."""
+        databases = (DEFAULT_DB_ALIAS,) + tuple(getattr(settings, 'REPLICA_DATABASES', ()))
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_syncdb(self, db, model):
+        """Tables are only created on the primary, they are replicated from there."""
+        return db not in getattr(settings, 'REPLICA_DATABASES', ())
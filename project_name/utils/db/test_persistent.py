@@ -0,0 +1,132 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import mock
+
+from . import persistent
+from .backends.sqlite3.base import DatabaseWrapper
+
+
+class PersistentConnectionTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def wrapper(self, **settings):
+        settings_dict = {
+            'NAME': os.path.join(self.dir, 'test.db'),
+            'OPTIONS': {},
+            'TIME_ZONE': None,
+        }
+        settings_dict.update(settings)
+        wrapper = DatabaseWrapper(settings_dict, alias='persistent')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_closes_by_default(self):
+        """Persistent backends should close the connection after each request by default."""
+        wrapper = self.wrapper()
+        wrapper.cursor().execute('SELECT 1')
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(wrapper.connection, None)
+
+    def test_keeps_connection(self):
+        """Persistent backends should keep the connection for CONN_MAX_AGE seconds."""
+        wrapper = self.wrapper(CONN_MAX_AGE=60)
+        wrapper.cursor().execute('SELECT 1')
+        connection = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        wrapper.cursor().execute('SELECT 1')
+
+        self.assertEqual(wrapper.connection, connection)
+
+    def test_closes_old_connections(self):
+        """Persistent backends should close connections older than CONN_MAX_AGE."""
+        wrapper = self.wrapper(CONN_MAX_AGE=60)
+        wrapper.cursor().execute('SELECT 1')
+        wrapper.close_at -= 61
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(wrapper.connection, None)
+
+    def test_keeps_connections_forever(self):
+        """Persistent backends should never close connections when CONN_MAX_AGE is None."""
+        wrapper = self.wrapper(CONN_MAX_AGE=None)
+        wrapper.cursor().execute('SELECT 1')
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertNotEqual(wrapper.connection, None)
+
+    def test_rolls_back(self):
+        """Persistent backends should roll back open transactions when a request finishes."""
+        wrapper = self.wrapper(CONN_MAX_AGE=60)
+        wrapper.cursor().execute('CREATE TABLE t (id integer)')
+        wrapper.connection.commit()
+        wrapper.cursor().execute('INSERT INTO t VALUES (1)')
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(wrapper.cursor().execute('SELECT COUNT(*) FROM t').fetchone(), (0,))
+
+    def test_health_checks(self):
+        """Persistent backends should reconnect when a kept connection is broken."""
+        wrapper = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        wrapper.cursor().execute('SELECT 1')
+        connection = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        connection.close()
+        wrapper.cursor().execute('SELECT 1')
+
+        self.assertNotEqual(wrapper.connection, connection)
+
+    def test_ignores_inherited_connections(self):
+        """Persistent backends should not use connections opened by a parent process."""
+        wrapper = self.wrapper(CONN_MAX_AGE=60)
+        wrapper.cursor().execute('SELECT 1')
+        connection = wrapper.connection
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            wrapper.cursor().execute('SELECT 1')
+
+        self.assertNotEqual(wrapper.connection, connection)
+        connection.close()
+
+
+class PersistentBackendSettingsTests(unittest.TestCase):
+    def test_replaces_close_connection(self):
+        """
+        Persistent backends should load as the ENGINE in DATABASES and keep
+        connections open at the end of requests.
+        """
+        settings_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, settings_dir)
+        package = persistent.__name__.rsplit('.', 1)[0]
+        with open(os.path.join(settings_dir, 'persistent_settings.py'), 'w') as f:
+            f.write('DATABASES = %r\nSECRET_KEY = "x"\n' % {'default': {
+                'ENGINE': package + '.backends.sqlite3', 'NAME': ':memory:'}})
+
+        script = (
+            'import sys\n'
+            'from django.core import signals\n'
+            'from django.db import connections, close_connection\n'
+            'from %s import persistent\n'
+            'signals.request_started.send(sender=None)\n'
+            'receivers = [receiver() for key, receiver in signals.request_finished.receivers]\n'
+            'sys.stdout.write(repr((isinstance(connections["default"], persistent.PersistentConnectionMixin),\n'
+            '    close_connection in receivers, persistent.close_old_connections in receivers)))\n'
+        ) % package
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='persistent_settings',
+            PYTHONPATH=os.pathsep.join([settings_dir] + sys.path))
+        process = subprocess.Popen([sys.executable, '-c', script], env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+
+        self.assertEqual(process.returncode, 0, stderr)
+        self.assertEqual(stdout, '(True, False, True)')
@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+
+import mock
+
+from . import routers
+from .routers import ReplicaRouter, use_replica, pick_replica, replica_lag
+
+
+class ReplicaRouterTests(unittest.TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def tearDown(self):
+        use_replica(None)
+
+    def test_reads_go_to_replica(self):
+        """ReplicaRouter should send reads to the replica of the current request."""
+        use_replica('replica')
+
+        self.assertEqual(self.router.db_for_read(User), 'replica')
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_reads_go_to_primary_after_writes(self):
+        """ReplicaRouter should send reads to the primary once the request wrote something."""
+        use_replica('replica')
+        self.router.db_for_write(User)
+
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_reads_go_to_primary_outside_of_requests(self):
+        """ReplicaRouter should send reads to the primary outside of read-only requests."""
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+
+class PickReplicaTests(unittest.TestCase):
+    def setUp(self):
+        routers._lag.clear()
+
+    def test_no_replicas(self):
+        """pick_replica should return None without REPLICA_DATABASES."""
+        with override_settings(REPLICA_DATABASES=()):
+            self.assertEqual(pick_replica(), None)
+
+    def test_skips_lagging_replicas(self):
+        """pick_replica should leave out replicas that are too far behind or down."""
+        lags = {'fast': 1, 'slow': 30, 'down': None}
+        with override_settings(REPLICA_DATABASES=('fast', 'slow', 'down'), REPLICA_MAX_LAG=10):
+            with mock.patch.object(routers, 'measure_lag', lags.get):
+                for i in range(10):
+                    self.assertEqual(pick_replica(), 'fast')
+
+    def test_all_replicas_lagging(self):
+        """pick_replica should return None when every replica is too far behind."""
+        with override_settings(REPLICA_DATABASES=('slow',), REPLICA_MAX_LAG=10):
+            with mock.patch.object(routers, 'measure_lag', return_value=30):
+                self.assertEqual(pick_replica(), None)
+
+    def test_caches_lag(self):
+        """replica_lag should only measure the lag every REPLICA_LAG_CHECK_INTERVAL seconds."""
+        with mock.patch.object(routers, 'measure_lag', return_value=1) as measure_lag:
+            replica_lag('replica')
+            replica_lag('replica')
+
+        self.assertEqual(measure_lag.call_count, 1)
+
+    def test_measure_lag(self):
+        """measure_lag should count databases it can't measure as up to date."""
+        self.assertEqual(routers.measure_lag('default'), 0)
+
+    def test_measure_lag_unknown_alias(self):
+        """measure_lag should count replicas that aren't in DATABASES as unavailable."""
+        self.assertEqual(routers.measure_lag('missing'), None)
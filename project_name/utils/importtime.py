@@ -0,0 +1,173 @@
+"""
+Measures how long the first import of each module takes, for the
+profile_imports command.
+
+Running this module boots the project in a fresh process and writes the
+import tree to a JSON file::
+
+    python -m {{ project_name }}.utils.importtime wsgi /tmp/imports.json {{ project_name }}.wsgi
+
+It only imports Django once the timer is installed, so Django's own imports
+are measured too.
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+import json
+import time
+import pkgutil
+
+
+class ImportTimer(object):
+    """
+    A sys.meta_path hook that times the first import of each module and
+    records the import tree: the modules imported while importing a module
+    are its children.
+
+    Each node is a dictionary with the `name` of the module, the
+    `cumulative` seconds its import took, the `self` seconds spent in the
+    module itself rather than its children, and the `children`.
+    """
+    def __init__(self):
+        self.root = {'name': None, 'cumulative': 0.0, 'self': 0.0, 'children': []}
+        self.stack = [self.root]
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        sys.meta_path.remove(self)
+        self.root['cumulative'] = sum(child['cumulative'] for child in self.root['children'])
+
+    def find_module(self, fullname, path=None):
+        """Finds the module the way the default import machinery would."""
+        for entry in sys.path if path is None else path:
+            importer = pkgutil.get_importer(entry)
+            if importer is None:
+                continue
+            loader = importer.find_module(fullname)
+            if loader is not None:
+                return TimedLoader(self, loader)
+        return None
+
+
+class TimedLoader(object):
+    def __init__(self, timer, loader):
+        self.timer = timer
+        self.loader = loader
+
+    def load_module(self, fullname):
+        node = {'name': fullname, 'children': []}
+        self.timer.stack[-1]['children'].append(node)
+        self.timer.stack.append(node)
+        start = time.time()
+        try:
+            return self.loader.load_module(fullname)
+        finally:
+            node['cumulative'] = time.time() - start
+            node['self'] = node['cumulative'] - sum(
+                child['cumulative'] for child in node['children'])
+            self.timer.stack.pop()
+
+
+def iter_nodes(node, depth=0):
+    """Yields (depth, node) for every module in the tree below `node`."""
+    for child in node['children']:
+        yield depth, child
+        for item in iter_nodes(child, depth + 1):
+            yield item
+
+
+def owner(module, apps):
+    """Returns the app in `apps` the module belongs to, or None."""
+    matches = [app for app in apps if module == app or module.startswith(app + '.')]
+    if not matches:
+        return None
+    return max(matches, key=len)
+
+
+def app_times(root, apps):
+    """
+    Returns a list of (app, seconds, number of modules) for each app in
+    `apps` with modules in the tree, slowest first. The seconds are the
+    self times of the app's modules, so an app isn't charged for the other
+    apps it imports.
+    """
+    totals = {}
+    for depth, node in iter_nodes(root):
+        app = owner(node['name'], apps)
+        if app is not None:
+            seconds, count = totals.get(app, (0.0, 0))
+            totals[app] = seconds + node['self'], count + 1
+    return sorted(((app, seconds, count) for app, (seconds, count) in totals.items()),
+        key=lambda item: item[1], reverse=True)
+
+
+def boot_wsgi(wsgi_module):
+    """
+    Boots the project like wsgi.py and the first request do: Django only
+    loads the middleware, models and URLconf when the first request comes in.
+    """
+    __import__(wsgi_module)
+    application = sys.modules[wsgi_module].application
+    from django.conf import settings
+    settings.INSTALLED_APPS
+    if hasattr(application, 'load_middleware'):
+        application.load_middleware()
+    from django.db.models.loading import get_apps
+    get_apps()
+    from django.core.urlresolvers import get_resolver
+    get_resolver(None).url_patterns
+
+
+def boot_manage(wsgi_module):
+    """Boots the project like manage.py does before running a command."""
+    from django.core.management import get_commands
+    get_commands()
+    from django.db.models.loading import get_apps
+    get_apps()
+
+
+def boot_celery(wsgi_module):
+    """Boots the project like a Celery worker does, including the tasks modules."""
+    from django.conf import settings
+    settings.INSTALLED_APPS
+    from django.db.models.loading import get_apps
+    get_apps()
+    from celery import current_app
+    current_app.loader.import_default_modules()
+
+
+ENTRY_POINTS = {
+    'wsgi': boot_wsgi,
+    'manage': boot_manage,
+    'celery': boot_celery,
+}
+
+
+def main(entry, output, wsgi_module):
+    timer = ImportTimer()
+    start = time.time()
+    timer.install()
+    try:
+        ENTRY_POINTS[entry](wsgi_module)
+    finally:
+        timer.uninstall()
+    elapsed = time.time() - start
+
+    from django.conf import settings
+    with open(output, 'w') as f:
+        json.dump({
+            'entry': entry,
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+            'debug': settings.DEBUG,
+            'installed_apps': list(settings.INSTALLED_APPS),
+            'dev_only_apps': list(getattr(settings, 'DEV_ONLY_APPS', ())),
+            'elapsed': elapsed,
+            'tree': timer.root,
+        }, f)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:4])
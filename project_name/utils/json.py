@@ -2,13 +2,150 @@ from __future__ import absolute_import
 
 import json
 import datetime
+import inspect
 import uuid
 import decimal
 import Cookie
 
+from django.conf import settings
 from django.http import HttpRequest, HttpResponse
 from django.utils.timezone import is_aware
 
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+
+# Maps a type to the function used to convert instances of it into something
+# JSON compatible. Lookups go through `_dispatch_cache` first, which maps the
+# exact type of an object to the function resolved through its MRO.
+_encoders = {}
+_dispatch_cache = {}
+
+
+def register(type_, fn):
+    """
+    Register `fn` as the JSON encoder for instances of `type_`.
+
+    `fn` takes the object as its only argument and returns a JSON compatible
+    representation of it. Subclasses of `type_` are handled too, unless a
+    more specific type has its own encoder registered. For example:
+
+    register(IPAddress, str)
+    """
+    _encoders[type_] = fn
+    _dispatch_cache.clear()
+
+
+def unregister(type_):
+    """Remove the JSON encoder registered for `type_`."""
+    del _encoders[type_]
+    _dispatch_cache.clear()
+
+
+def get_encoder(type_):
+    """
+    Returns the encoder function for `type_` or None if there isn't one.
+
+    The first type in the MRO of `type_` that has an encoder registered wins.
+    The result is cached so later lookups are a single dictionary access.
+    """
+    try:
+        return _dispatch_cache[type_]
+    except KeyError:
+        pass
+
+    fn = None
+    for base in inspect.getmro(type_):
+        if base in _encoders:
+            fn = _encoders[base]
+            break
+
+    _dispatch_cache[type_] = fn
+    return fn
+
+
+def encode_datetime(o):
+    r = o.isoformat()
+    if o.microsecond:
+        r = r[:23] + r[26:]
+    if r.endswith('+00:00'):
+        r = r[:-6] + 'Z'
+    return r
+
+
+def encode_date(o):
+    return o.isoformat()
+
+
+def encode_time(o):
+    if is_aware(o):
+        raise ValueError("JSON can't represent timezone-aware times.")
+    r = o.isoformat()
+    if o.microsecond:
+        r = r[:12]
+    return r
+
+
+def encode_simplecookie(o):
+    cookies = {}
+    for cookie, morsel in o.iteritems():
+        cookies[cookie] = dict(morsel)
+        cookies[cookie]['value'] = morsel.value
+    return cookies
+
+
+def encode_httprequest(request):
+    """
+    Returns a summary of the request.
+
+    Everything but the request id, the session key and the user id is worked
+    out the first time the request is encoded and kept on the request, so a
+    request that is logged several times only has its headers collected once.
+
+    Only the headers listed in the LOG_REQUEST_HEADERS setting are included.
+    If the setting is None all the HTTP headers are included.
+    """
+    summary = request.__dict__.get('_json_summary')
+    if summary is None:
+        allowed = getattr(settings, 'LOG_REQUEST_HEADERS', None)
+        META = request.META
+        if allowed is None:
+            headers = dict((key, value) for key, value in META.iteritems() if key.startswith('HTTP_'))
+        else:
+            headers = dict((key, META[key]) for key in allowed if key in META)
+
+        summary = request._json_summary = {
+            'path_info': request.path_info,
+            'method': request.method,
+            'META': headers,
+        }
+
+    summary = summary.copy()
+    summary['id'] = getattr(request, 'id', None)
+    summary['session'] = getattr(getattr(request, 'session', None), '_session_key', None)
+    summary['user'] = getattr(getattr(request, 'user', None), 'id', None)
+    return summary
+
+
+def encode_httpresponse(response):
+    return {
+        'status_code': response.status_code,
+        'headers': response._headers,
+        'cookies': response.cookies
+    }
+
+
+register(datetime.datetime, encode_datetime)
+register(datetime.date, encode_date)
+register(datetime.time, encode_time)
+register(decimal.Decimal, str)
+register(uuid.UUID, str)
+register(Cookie.SimpleCookie, encode_simplecookie)
+register(HttpRequest, encode_httprequest)
+register(HttpResponse, encode_httpresponse)
+
 
 class ExtendedJSONEncoder(json.JSONEncoder):
     """
@@ -27,60 +164,101 @@ class ExtendedJSONEncoder(json.JSONEncoder):
     during settings initialization.
 
     For Django HttpRequest objects it returns a dictionary containing the
-    session key, the user id, the path, the method, any HTTP headers and the id
-    of the request.
+    session key, the user id, the path, the method, the HTTP headers listed in
+    the LOG_REQUEST_HEADERS setting and the id of the request.
+
+    Additional types can be supported by calling `register()` instead of
+    subclassing. The encoder for an object is found with a single dictionary
+    lookup on its type, instead of testing it against every supported type.
     """
     def default(self, o):
-        if isinstance(o, datetime.datetime):
-            r = o.isoformat()
-            if o.microsecond:
-                r = r[:23] + r[26:]
-            if r.endswith('+00:00'):
-                r = r[:-6] + 'Z'
-            return r
-
-        elif isinstance(o, datetime.date):
-            return o.isoformat()
-
-        elif isinstance(o, datetime.time):
-            if is_aware(o):
-                raise ValueError("JSON can't represent timezone-aware times.")
-            r = o.isoformat()
-            if o.microsecond:
-                r = r[:12]
-            return r
-
-        elif isinstance(o, decimal.Decimal):
-            return str(o)
-
-        elif isinstance(o, uuid.UUID):
-            return str(o)
-
-        elif isinstance(o, Cookie.SimpleCookie):
-            cookies = {}
-            for cookie, morsel in o.iteritems():
-                cookies[cookie] = dict(morsel)
-                cookies[cookie]['value'] = morsel.value
-            return cookies
-
-        elif isinstance(o, HttpRequest):
-            request = o
-            return {
-                'session': getattr(getattr(request, 'session', None), '_session_key', None),
-                'user': getattr(getattr(request, 'user', None), 'id', None),
-                'path_info': request.path_info,
-                'method': request.method,
-                'id': getattr(request, 'id', None),
-                'META': dict([(key, value) for key, value in request.META.iteritems() if key.startswith('HTTP_')]),
-            }
-
-        elif isinstance(o, HttpResponse):
-            response = o
-            return {
-                'status_code': response.status_code,
-                'headers': response._headers,
-                'cookies': response.cookies
-            }
+        fn = get_encoder(getattr(o, '__class__', type(o)))
+        if fn is not None:
+            return fn(o)
+        return super(ExtendedJSONEncoder, self).default(o)
 
-        else:
-            return super(ExtendedJSONEncoder, self).default(o)
+
+class Backend(object):
+    """
+    A JSON serializer that ExtendedJSONEncoder can hand the actual encoding
+    to. Backends only need to serialize the native JSON types, anything else
+    is passed to the `default` method of the encoder.
+
+    This one uses the standard library json module, which is always
+    available.
+    """
+    name = 'json'
+    module = json
+
+    @property
+    def available(self):
+        return self.module is not None
+
+    def encode_function(self, encoder):
+        """
+        Returns a function that takes an object and returns it as a string
+        of JSON, calling `encoder.default` for unsupported types.
+        """
+        return encoder.encode
+
+
+class SimpleJSONBackend(Backend):
+    """
+    simplejson with its C speedups.
+
+    simplejson serializes Decimals and namedtuples itself by default, that's
+    turned off so they are encoded the same way as with the json module.
+
+    The options of the encoder, like `sort_keys` or `indent`, and its
+    `default` method are passed on to simplejson. An encoder that overrides
+    `encode` or `iterencode` should use the json backend instead, simplejson
+    doesn't call those.
+    """
+    name = 'simplejson'
+    module = simplejson
+
+    def encode_function(self, encoder):
+        return simplejson.JSONEncoder(
+            skipkeys=encoder.skipkeys,
+            ensure_ascii=encoder.ensure_ascii,
+            check_circular=encoder.check_circular,
+            allow_nan=encoder.allow_nan,
+            sort_keys=encoder.sort_keys,
+            indent=encoder.indent,
+            separators=(encoder.item_separator, encoder.key_separator),
+            default=encoder.default,
+            use_decimal=False,
+            namedtuple_as_object=False,
+        ).encode
+
+
+# Backends in order of preference.
+backends = (SimpleJSONBackend(), Backend())
+
+
+def get_backend(name=None):
+    """
+    Returns the backend called `name`, or the fastest available backend if
+    no name is given.
+
+    Raises ValueError for unknown backends and ImportError for backends
+    that aren't installed.
+    """
+    for backend in backends:
+        if name is None and backend.available:
+            return backend
+
+        if backend.name == name:
+            if not backend.available:
+                raise ImportError('The %s JSON backend is not installed.' % name)
+            return backend
+
+    raise ValueError('Unknown JSON backend %r.' % name)
+
+
+def dumps(o, cls=ExtendedJSONEncoder, backend=None):
+    """
+    Returns `o` as a string of JSON using the given backend, or the fastest
+    available one.
+    """
+    return get_backend(backend).encode_function(cls())(o)
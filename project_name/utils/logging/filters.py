@@ -0,0 +1,17 @@
+from __future__ import absolute_import
+
+import logging
+
+from ..middleware.request_id import get_request_id
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Adds the ID of the request being handled to every LogRecord as
+    `request_id`, so log records can be tied to a request even when the
+    request isn't passed in `extra`. Celery tasks get the ID of the request
+    that queued them, see utils.celery.
+    """
+    def filter(self, record):
+        record.request_id = get_request_id()
+        return True
@@ -1,9 +1,48 @@
 import logging
 import json
 import datetime
+import operator
 import traceback
+from json.encoder import encode_basestring_ascii
 
-from ..json import ExtendedJSONEncoder
+from ..json import ExtendedJSONEncoder, get_backend
+
+
+INFINITY = float('inf')
+
+
+def fields_getter(fields):
+    """
+    Returns a function that fetches all of `fields` from an object as a tuple.
+
+    operator.attrgetter only returns a tuple when it's given several names so
+    the single field and no field cases are wrapped.
+    """
+    if len(fields) == 1:
+        getter = operator.attrgetter(fields[0])
+        return lambda obj: (getter(obj),)
+    elif fields:
+        return operator.attrgetter(*fields)
+    return lambda obj: ()
+
+
+def encode_float(o):
+    if o != o or o in (INFINITY, -INFINITY):
+        return json.dumps(o)
+    return repr(o)
+
+
+# JSON for the types of values that are found on every LogRecord, these skip
+# the JSON encoder entirely.
+scalar_encoders = {
+    int: str,
+    long: str,
+    float: encode_float,
+    str: encode_basestring_ascii,
+    unicode: encode_basestring_ascii,
+    bool: lambda o: 'true' if o else 'false',
+    type(None): lambda o: 'null',
+}
 
 
 class JSONFormatter(logging.Formatter):
@@ -35,7 +74,10 @@ class JSONFormatter(logging.Formatter):
         'msg', 'args', 'exc_text', 'name', 'thread', 'created', 'threadName',
         'msecs', 'pathname', 'exc_info', 'levelname'])
 
-    def __init__(self, layout=None, json_encoder=ExtendedJSONEncoder):
+    # The most key sets process_extra remembers before starting over.
+    extra_keys_cache_size = 1024
+
+    def __init__(self, layout=None, json_encoder=ExtendedJSONEncoder, json_backend=None):
         """
         You can specify two different options to custimize the final JSON
         output.
@@ -46,21 +88,67 @@ class JSONFormatter(logging.Formatter):
         json_encoder - The encoder class to use when converting objects into
             there JSON compatible counterparts. You can override this to allow
             for additional types to be stored in JSON.
+
+        json_backend - The name of the library that does the actual encoding,
+            'simplejson' or 'json'. By default simplejson is used when it's
+            installed. Types the library doesn't support
+            are still converted by the `default` method of `json_encoder`.
         """
         self.layout = self.default_layout
         if layout:
             self.layout = layout
 
         self.json_encoder = json_encoder
+        self.encoder = json_encoder()
+        self.backend = get_backend(json_backend)
+        self.encode = self.backend.encode_function(self.encoder)
+        self.plan = self.compile_layout(self.layout)
+        self.template, self.getter, self.exception_prefix = self.compile_template(self.layout)
+        self.has_extra = 'extra' in self.layout
+        self.has_exception = 'exception' in self.layout
+        self.extra_keys_cache = {}
+
+    def compile_layout(self, layout):
+        """
+        Turns a layout dictionary into a tuple of steps that fill_layout can
+        run through without inspecting the layout again.
+
+        Each step is a `(name, fields, getter)` tuple. For the `extra` and
+        `exception` sections `fields` and `getter` are None. For every other
+        section `getter` is an operator.attrgetter that fetches all the fields
+        of the section from a LogRecord at once.
+        """
+        plan = []
+        for name, fields in layout.items():
+            if name in ('extra', 'exception'):
+                plan.append((name, None, None))
+                continue
+
+            fields = tuple(fields)
+            plan.append((name, fields, fields_getter(fields)))
+        return tuple(plan)
 
     def process_extra(self, record):
         """
         Determines the difference between the default set of fields on a
         LogRecord and the actual set of keys. These additional fields are the
         `extra` fields for the LogRecord.
+
+        Most logging calls pass the same `extra` keys every time, so the
+        extra keys are cached using the keys of the LogRecord as the cache
+        key.
         """
-        extra_keys = set(record.__dict__.keys()).difference(self.default_fields)
-        return dict([(key, getattr(record, key)) for key in extra_keys])
+        fields = record.__dict__
+        signature = tuple(fields)
+        try:
+            extra_keys = self.extra_keys_cache[signature]
+        except KeyError:
+            default_fields = self.default_fields
+            extra_keys = tuple(key for key in signature if key not in default_fields)
+            if len(self.extra_keys_cache) >= self.extra_keys_cache_size:
+                self.extra_keys_cache.clear()
+            self.extra_keys_cache[signature] = extra_keys
+        return {key: fields[key] for key in extra_keys}
 
     def process_exception(self, exc_info):
         """
@@ -75,26 +163,73 @@ class JSONFormatter(logging.Formatter):
             'traceback': [dict(zip(st_fields, st)) for st in traceback.extract_tb(exc_info[2])],
         }
 
-    def fill_layout(self, record, layout):
+    def compile_template(self, layout):
+        """
+        Turns a layout dictionary into a string template for the final JSON,
+        a function that returns the values to fill it with and the text that
+        goes before the `exception` section.
+
+        All the keys are encoded ahead of time and every section except
+        `extra` and `exception` gets its fields from one attrgetter call. The
+        template has a placeholder for each field, one for the `extra`
+        section and a final one for the optional `exception` section.
+        """
+        sections = []
+        all_fields = []
+        for name, fields in layout.items():
+            if name in ('extra', 'exception'):
+                continue
+
+            fields = tuple(fields)
+            all_fields.extend(fields)
+            sections.append('%s: {%s}' % (
+                self.encode_key(name),
+                ', '.join('%s: %%s' % self.encode_key(field) for field in fields)
+            ))
+
+        if 'extra' in layout:
+            sections.append('"extra": %s')
+
+        template = '{' + ', '.join(sections) + '%s}'
+        # The exception section needs a comma only after another section.
+        exception_prefix = (', ' if sections else '') + '"exception": '
+        return template, fields_getter(all_fields), exception_prefix
+
+    def encode_key(self, key):
+        """Returns `key` as JSON which is safe to use in a template."""
+        return encode_basestring_ascii(key).replace('%', '%%')
+
+    def encode_value(self, value):
+        """
+        Returns `value` as JSON. Common scalar types are converted directly,
+        anything else goes through the JSON encoder.
+        """
+        fn = scalar_encoders.get(type(value))
+        if fn is None:
+            return self.encode(value)
+        return fn(value)
+
+    def fill_layout(self, record, layout=None):
         """
         Returns a dictionary of nested dictionaries with data from the
         LogRecord. It uses the layout dictionary defined in the format option
         as the as the template to follow.
+
+        The layout is compiled once when the formatter is created, passing in
+        a different layout compiles it on every call.
         """
+        plan = self.plan
+        if layout is not None and layout is not self.layout:
+            plan = self.compile_layout(layout)
+
         final = {}
-        for name, fields in layout.items():
-            if name is 'extra':
+        for name, fields, getter in plan:
+            if getter is not None:
+                final[name] = dict(zip(fields, getter(record)))
+            elif name == 'extra':
                 final['extra'] = self.process_extra(record)
-                continue
-
-            if name is 'exception':
-                if record.exc_info:
-                    final['exception'] = self.process_exception(record.exc_info)
-                continue
-
-            final[name] = {}
-            for field in fields:
-                final[name][field] = getattr(record, field)
+            elif record.exc_info:
+                final['exception'] = self.process_exception(record.exc_info)
         return final
 
     def formatDate(self, timestamp):
@@ -109,10 +244,27 @@ class JSONFormatter(logging.Formatter):
 
     def format(self, record):
         """
-        Add `message` and `asctime` to the LogRecord and then process the log
-        message into a dictionary which is returned a string of JSON.
+        Add `message` and `asctime` to the LogRecord and then render the log
+        message into a string of JSON.
+
+        This doesn't build the nested dictionaries from fill_layout, the
+        values are written straight into the compiled template instead. The
+        JSON encoder is only used for the `extra` and `exception` sections
+        and for any values that aren't simple scalars.
         """
         record.message = record.getMessage()
         record.asctime = self.formatDate(record.created)
-        log_data = self.fill_layout(record, self.layout)
-        return json.dumps(log_data, cls=self.json_encoder)
+
+        # This is encode_value() inlined, it runs for every field.
+        get, encode = scalar_encoders.get, self.encode
+        values = [(get(type(value)) or encode)(value) for value in self.getter(record)]
+        if self.has_extra:
+            values.append(self.encode(self.process_extra(record)))
+
+        if self.has_exception and record.exc_info:
+            values.append(self.exception_prefix + self.encode(
+                self.process_exception(record.exc_info)))
+        else:
+            values.append('')
+
+        return self.template % tuple(values)
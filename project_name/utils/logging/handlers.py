@@ -0,0 +1,271 @@
+from __future__ import absolute_import
+
+import os
+import logging
+import logging.handlers
+import threading
+import Queue
+
+
+class AsyncHandlerMixin(object):
+    """
+    Moves formatting and writing of log records off the logging thread.
+
+    Log records are put on a bounded queue and a background thread passes
+    them to the `emit` method of the handler this is mixed into. The thread
+    is started on the first log record in each process, so it's safe to
+    configure logging before a web server forks its workers.
+
+    When the queue is full the `full_policy` decides what happens:
+
+    drop - The log record is thrown away. This is the default.
+    block - The logging call waits until there is room in the queue.
+    sample - Every `sample_rate`th log record waits for room in the queue,
+        the others are thrown away.
+
+    Records at or above `block_level` always wait for room, no matter the
+    policy. A warning with the number of records that were thrown away is
+    logged once there is room again.
+
+    Note that log records are formatted after the logging call returns, so
+    objects passed in `extra` shouldn't be changed afterwards.
+    """
+    full_policies = ('drop', 'block', 'sample')
+
+    def __init__(self, *args, **kwargs):
+        self.queue_size = kwargs.pop('queue_size', 10000)
+        self.full_policy = kwargs.pop('full_policy', 'drop')
+        self.sample_rate = kwargs.pop('sample_rate', 10)
+        self.block_level = kwargs.pop('block_level', logging.ERROR)
+        if self.full_policy not in self.full_policies:
+            raise ValueError('Unknown full_policy %r, choose from: %s' % (
+                self.full_policy, ', '.join(self.full_policies)))
+
+        super(AsyncHandlerMixin, self).__init__(*args, **kwargs)
+
+        self.queue = None
+        self.thread = None
+        self.pid = None
+        self.dropped = 0
+        self.full = 0
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        """Start the background thread and create a queue for it."""
+        self.queue = Queue.Queue(self.queue_size)
+        self.dropped = 0
+        self.full = 0
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self.run,
+            name='%s writer' % self.__class__.__name__)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        """Pass log records from the queue to the handler until stopped."""
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    break
+
+                if self.dropped:
+                    self.emit_dropped()
+                super(AsyncHandlerMixin, self).emit(record)
+            finally:
+                self.queue.task_done()
+
+    def emit_dropped(self):
+        """Log a warning with the number of log records that were dropped."""
+        dropped, self.dropped = self.dropped, 0
+        record = logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': 'WARNING',
+            'msg': '%d log records dropped, the log queue was full',
+            'args': (dropped,),
+        })
+        super(AsyncHandlerMixin, self).emit(record)
+
+    def handle(self, record):
+        """
+        Filter and emit the log record.
+
+        Unlike Handler.handle this doesn't hold the handler lock while
+        emitting, a logging call waiting for room in the queue would stop the
+        background thread from taking the lock to flush.
+        """
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        """Put the log record on the queue for the background thread."""
+        if self.pid != os.getpid():
+            with self.start_lock:
+                if self.pid != os.getpid():
+                    self.start()
+
+        try:
+            self.queue.put_nowait(record)
+            return
+        except Queue.Full:
+            pass
+
+        self.full += 1
+        if (record.levelno >= self.block_level
+                or self.full_policy == 'block'
+                or (self.full_policy == 'sample' and self.full % self.sample_rate == 0)):
+            self.queue.put(record)
+        else:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait for the queued log records to be written then flush."""
+        if threading.current_thread() is self.thread:
+            # Called from emit on the background thread. logging.shutdown
+            # holds the handler lock while it waits for the queue, so flush
+            # the stream without taking the lock.
+            stream = getattr(self, 'stream', None)
+            if stream is not None and hasattr(stream, 'flush'):
+                stream.flush()
+            return
+
+        if self.queue is not None and self.pid == os.getpid():
+            self.queue.join()
+        super(AsyncHandlerMixin, self).flush()
+
+    def close(self):
+        """Write out the queued log records and stop the background thread."""
+        if self.thread is not None and self.pid == os.getpid():
+            self.queue.put(None)
+            self.thread.join()
+        self.thread = None
+        self.pid = None
+        super(AsyncHandlerMixin, self).close()
+
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    A RotatingFileHandler that collects formatted log records in a buffer
+    and writes them to the file together.
+
+    The buffer is written out when it holds `buffer_size` bytes, when
+    `flush_interval` seconds have passed since the first record was added to
+    it, or straight away for records at or above `flush_level`.
+
+    Rotation works the same as RotatingFileHandler, the file is rolled over
+    before a record that would take it past `maxBytes`.
+    """
+    def __init__(self, *args, **kwargs):
+        self.buffer_size = kwargs.pop('buffer_size', 64 * 1024)
+        self.flush_interval = kwargs.pop('flush_interval', 1.0)
+        self.flush_level = kwargs.pop('flush_level', logging.ERROR)
+
+        super(BufferedRotatingFileHandler, self).__init__(*args, **kwargs)
+
+        self.reset_buffer()
+
+    def reset_buffer(self):
+        self.buffer = []
+        self.buffered = 0
+        # The handler lock can be held by logging.shutdown while it waits for
+        # an AsyncHandlerMixin queue, so the buffer has its own lock.
+        self.buffer_lock = threading.RLock()
+        self.timer = None
+        self.buffer_pid = os.getpid()
+
+    def check_pid(self):
+        """
+        Start with an empty buffer in a forked process. The parent writes the
+        records it buffered itself, and the buffer lock may have been held by
+        another of the parent's threads when the process was forked.
+        """
+        if self.buffer_pid != os.getpid():
+            self.reset_buffer()
+
+    def emit(self, record):
+        """Format the log record and add it to the buffer."""
+        try:
+            msg = self.format(record) + '\n'
+            self.check_pid()
+            with self.buffer_lock:
+                self.buffer.append(msg)
+                self.buffered += len(msg)
+                if self.buffered >= self.buffer_size or record.levelno >= self.flush_level:
+                    self.flush_buffer()
+                elif self.timer is None:
+                    self.timer = threading.Timer(self.flush_interval, self.flush_buffer)
+                    self.timer.daemon = True
+                    self.timer.start()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+    def flush_buffer(self):
+        """
+        Write the buffer to the file, with one write per file when the file
+        needs to be rolled over part of the way through.
+        """
+        self.check_pid()
+        with self.buffer_lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            if not self.buffer:
+                return
+
+            buffer, self.buffer, self.buffered = self.buffer, [], 0
+            if self.stream is None:
+                self.stream = self._open()
+
+            chunk, size = [], 0
+            if self.maxBytes > 0:
+                self.stream.seek(0, 2)  # Same as RotatingFileHandler.
+                size = self.stream.tell()
+            for msg in buffer:
+                if self.maxBytes > 0 and size + len(msg) >= self.maxBytes:
+                    self.write(chunk)
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                    chunk, size = [], 0
+                chunk.append(msg)
+                size += len(msg)
+            self.write(chunk)
+            self.stream.flush()
+
+    def write(self, chunk):
+        """Write a list of formatted log records to the file in one go."""
+        if not chunk:
+            return
+
+        data = ''.join(chunk)
+        if isinstance(data, unicode) and not getattr(self.stream, 'encoding', None):
+            data = data.encode('utf-8')
+        self.stream.write(data)
+
+    def flush(self):
+        """Write out the buffer and flush the file."""
+        self.flush_buffer()
+        super(BufferedRotatingFileHandler, self).flush()
+
+    def close(self):
+        """Write out the buffer and close the file."""
+        self.flush_buffer()
+        super(BufferedRotatingFileHandler, self).close()
+
+
+class AsyncRotatingFileHandler(AsyncHandlerMixin, logging.handlers.RotatingFileHandler):
+    """A RotatingFileHandler that writes from a background thread."""
+
+
+class AsyncBufferedRotatingFileHandler(AsyncHandlerMixin, BufferedRotatingFileHandler):
+    """A BufferedRotatingFileHandler that formats and writes from a background thread."""
+
+
+class AsyncWatchedFileHandler(AsyncHandlerMixin, logging.handlers.WatchedFileHandler):
+    """A WatchedFileHandler that writes from a background thread."""
@@ -0,0 +1,27 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import logging
+
+from ..middleware.request_id import set_request_id
+from .filters import RequestIdFilter
+
+
+class RequestIdFilterTests(unittest.TestCase):
+    def tearDown(self):
+        set_request_id(None)
+
+    def test_adds_request_id(self):
+        """RequestIdFilter should add the current request id to the LogRecord."""
+        set_request_id('requestid')
+        record = logging.makeLogRecord({})
+
+        self.assertTrue(RequestIdFilter().filter(record))
+        self.assertEqual(record.request_id, 'requestid')
+
+    def test_outside_of_requests(self):
+        """RequestIdFilter should set the request id to None outside of requests."""
+        record = logging.makeLogRecord({})
+        RequestIdFilter().filter(record)
+
+        self.assertEqual(record.request_id, None)
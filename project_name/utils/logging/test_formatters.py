@@ -1,16 +1,22 @@
 from django.utils import unittest
 import json
 import sys
-
-import mock
+import decimal
 
 from .formatters import JSONFormatter
+from .. import json as json_utils
 
 
 class JSONFormatterTests(unittest.TestCase):
+    backend = 'json'
+
+    def formatter(self, **kwargs):
+        """Returns a JSONFormatter that uses the JSON backend being tested."""
+        return JSONFormatter(json_backend=self.backend, **kwargs)
+
     def test_out_is_valid_json(self):
         """JSONFormatter should output valid JSON."""
-        formatter = JSONFormatter()
+        formatter = self.formatter()
         output = formatter.format(self.FakeLogRecord())
 
         self.assertIsInstance(json.loads(output), dict)
@@ -28,7 +34,7 @@ class JSONFormatterTests(unittest.TestCase):
             'message': {'msg': 'in main function %s', 'message': "in main function ['foo']", 'args': ['foo']}
         }
 
-        formatter = JSONFormatter()
+        formatter = self.formatter()
         output_json = formatter.format(self.FakeLogRecord())
         output = json.loads(output_json)
 
@@ -51,7 +57,7 @@ class JSONFormatterTests(unittest.TestCase):
             'message': ['message']
         }
 
-        formatter = JSONFormatter(layout=custom_layout)
+        formatter = self.formatter(layout=custom_layout)
         output_json = formatter.format(self.FakeLogRecord())
         output = json.loads(output_json)
 
@@ -63,26 +69,123 @@ class JSONFormatterTests(unittest.TestCase):
         """
         expected_output = {'ip': '127.0.0.1', 'foo': 'asfd'}
 
-        formatter = JSONFormatter()
+        formatter = self.formatter()
         output = formatter.process_extra(self.FakeLogRecord())
 
         self.assertEqual(output, expected_output)
 
+    def test_compile_layout(self):
+        """
+        JSONFormatter.compile_layout should return a step for every section in the layout.
+        """
+        formatter = self.formatter()
+        plan = formatter.compile_layout({'logger': ['name', 'levelno'], 'extra': ''})
+
+        self.assertEqual(sorted(step[0] for step in plan), ['extra', 'logger'])
+
+    def test_fill_layout_with_another_layout(self):
+        """
+        JSONFormatter.fill_layout should use the layout it is given instead of the compiled one.
+        """
+        formatter = self.formatter()
+        output = formatter.fill_layout(self.FakeLogRecord(), {'logger': ['name']})
+
+        self.assertEqual(output, {'logger': {'name': 'main'}})
+
+    def test_format_matches_fill_layout(self):
+        """
+        JSONFormatter.format should output the same data as fill_layout.
+        """
+        formatter = self.formatter()
+        record = self.FakeLogRecord()
+        output = json.loads(formatter.format(record))
+
+        self.assertEqual(output, json.loads(json.dumps(formatter.fill_layout(record))))
+
+    def test_format_includes_exception(self):
+        """
+        JSONFormatter.format should add the exception section when the LogRecord has exception info.
+        """
+        formatter = self.formatter()
+        record = self.FakeLogRecord()
+
+        try:
+            5 + 'boom!'
+        except TypeError:
+            record.exc_info = sys.exc_info()
+
+        output = json.loads(formatter.format(record))
+        self.assertEqual(output['exception']['type'], "<type 'exceptions.TypeError'>")
+
+    def test_format_exception_only_layout(self):
+        """
+        JSONFormatter.format should output valid JSON for a layout with only the exception section.
+        """
+        formatter = self.formatter(layout={'exception': []})
+        record = self.FakeLogRecord()
+
+        try:
+            5 + 'boom!'
+        except TypeError:
+            record.exc_info = sys.exc_info()
+
+        self.assertEqual(list(json.loads(formatter.format(record))), ['exception'])
+        record.exc_info = None
+        self.assertEqual(json.loads(formatter.format(record)), {})
+
+    def test_format_encodes_non_scalar_fields(self):
+        """
+        JSONFormatter.format should use the JSON encoder for fields that aren't simple scalars.
+        """
+        formatter = self.formatter(layout={'message': ['args']})
+        record = self.FakeLogRecord()
+        record.args = [decimal.Decimal('1.51'), None, True]
+
+        output = json.loads(formatter.format(record))
+        self.assertEqual(output, {'message': {'args': ['1.51', None, True]}})
+
+    def test_proccess_extra_with_different_keys(self):
+        """
+        JSONFormatter.process_extra should find the `extra` parameters of LogRecords with different keys.
+        """
+        formatter = self.formatter()
+        record = self.FakeLogRecord()
+        formatter.process_extra(record)
+        record.user = 10
+
+        output = formatter.process_extra(record)
+        self.assertEqual(output, {'ip': '127.0.0.1', 'foo': 'asfd', 'user': 10})
+
+    def test_proccess_extra_cache_is_bounded(self):
+        """
+        JSONFormatter.process_extra should not cache more key sets than extra_keys_cache_size.
+        """
+        formatter = self.formatter()
+        formatter.extra_keys_cache_size = 2
+        record = self.FakeLogRecord()
+
+        for i in range(5):
+            setattr(record, 'extra%d' % i, i)
+            formatter.process_extra(record)
+
+        self.assertTrue(len(formatter.extra_keys_cache) <= 2)
+
     def test_custom_json_encoder(self):
         """
         JSONFormatter should use a custom JSON encoder if it is specified.
         """
-        custom_layout = {'extra': ''}
-        mocked_json_encoder = mock.MagicMock()
-        formatter = JSONFormatter(
-            layout=custom_layout,
-            json_encoder=mocked_json_encoder
-        )
+        class SetEncoder(json_utils.ExtendedJSONEncoder):
+            def default(self, o):
+                if isinstance(o, set):
+                    return sorted(o)
+                return super(SetEncoder, self).default(o)
 
+        formatter = self.formatter(layout={'message': ['args']}, json_encoder=SetEncoder)
         record = self.FakeLogRecord()
+        record.args = [set(['b', 'a'])]
 
-        formatter.format(record)
-        self.assertTrue(mocked_json_encoder.called)
+        output = json.loads(formatter.format(record))
+        self.assertEqual(output, {'message': {'args': [['a', 'b']]}})
 
     def test_formatDate(self):
         """
@@ -91,7 +194,7 @@ class JSONFormatterTests(unittest.TestCase):
         expected_output = '2012-11-20T23:30:59.111096Z'
         timestamp = 1353454259.111096
 
-        formatter = JSONFormatter()
+        formatter = self.formatter()
         output = formatter.formatDate(timestamp)
 
         self.assertEqual(output, expected_output)
@@ -100,7 +203,7 @@ class JSONFormatterTests(unittest.TestCase):
         """
         JSONFormatter.process_exception should return a dictionary with exception info.
         """
-        formatter = JSONFormatter()
+        formatter = self.formatter()
 
         try:
             5 + 'boom!'
@@ -112,6 +215,14 @@ class JSONFormatterTests(unittest.TestCase):
         self.assertEqual(output['value'], "unsupported operand type(s) for +: 'int' and 'str'")
         self.assertEqual(output['traceback'][0]['function_name'], 'test_proccess_exception')
 
+    def test_uses_json_backend(self):
+        """
+        JSONFormatter should use the JSON backend it is given.
+        """
+        formatter = self.formatter()
+
+        self.assertEqual(formatter.backend.name, self.backend)
+
     class FakeLogRecord(object):
         """A fake log record for testing."""
         def __init__(self):
@@ -137,3 +248,8 @@ class JSONFormatterTests(unittest.TestCase):
 
         def getMessage(self):
             return self.msg % self.args
+
+
+@unittest.skipUnless(json_utils.simplejson, 'simplejson is not installed')
+class SimpleJSONJSONFormatterTests(JSONFormatterTests):
+    backend = 'simplejson'
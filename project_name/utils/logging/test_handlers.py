@@ -0,0 +1,257 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import mock
+
+from .handlers import AsyncHandlerMixin, AsyncRotatingFileHandler,\
+    BufferedRotatingFileHandler, AsyncBufferedRotatingFileHandler
+
+
+class ListHandler(logging.Handler):
+    """A handler that keeps the log records it's given in a list."""
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+        self.writing = threading.Event()
+        self.writing.set()
+
+    def emit(self, record):
+        self.writing.wait()
+        self.records.append(record)
+
+
+class AsyncListHandler(AsyncHandlerMixin, ListHandler):
+    pass
+
+
+class AsyncHandlerMixinTests(unittest.TestCase):
+    def record(self, msg='message', level=logging.INFO):
+        return logging.makeLogRecord({'msg': msg, 'levelno': level})
+
+    def fill_queue(self, handler):
+        """Stops the background thread and fills the queue up."""
+        handler.writing.clear()
+        handler.handle(self.record('in progress'))
+        while not handler.queue.empty():
+            pass
+        handler.handle(self.record('queued'))
+
+    def messages(self, handler):
+        return [record.getMessage() for record in handler.records]
+
+    def test_emits_records_in_the_background(self):
+        """AsyncHandlerMixin should pass log records to the handler from a background thread."""
+        handler = AsyncListHandler()
+        handler.handle(self.record())
+        handler.flush()
+
+        self.assertEqual(self.messages(handler), ['message'])
+        self.assertNotEqual(handler.thread, threading.current_thread())
+        handler.close()
+
+    def test_close_writes_queued_records(self):
+        """AsyncHandlerMixin.close should write out all the queued log records and stop the thread."""
+        handler = AsyncListHandler()
+        for i in range(100):
+            handler.handle(self.record())
+        thread = handler.thread
+        handler.close()
+
+        self.assertEqual(len(handler.records), 100)
+        self.assertFalse(thread.is_alive())
+
+    def test_drop_policy(self):
+        """AsyncHandlerMixin should drop log records when the queue is full and report how many were dropped."""
+        handler = AsyncListHandler(queue_size=1, full_policy='drop')
+        self.fill_queue(handler)
+        handler.handle(self.record('dropped'))
+        handler.handle(self.record('dropped'))
+        handler.writing.set()
+        handler.handle(self.record('after'))
+        handler.close()
+
+        self.assertEqual(self.messages(handler), ['in progress',
+            '2 log records dropped, the log queue was full', 'queued', 'after'])
+
+    def test_block_policy(self):
+        """AsyncHandlerMixin should wait for room in the queue with the block policy."""
+        handler = AsyncListHandler(queue_size=1, full_policy='block')
+        self.fill_queue(handler)
+        threading.Timer(0.05, handler.writing.set).start()
+        handler.handle(self.record('blocked'))
+        handler.close()
+
+        self.assertEqual(self.messages(handler), ['in progress', 'queued', 'blocked'])
+
+    def test_sample_policy(self):
+        """AsyncHandlerMixin should keep every sample_rate'th log record with the sample policy."""
+        handler = AsyncListHandler(queue_size=1, full_policy='sample', sample_rate=3)
+        self.fill_queue(handler)
+        handler.handle(self.record('dropped'))
+        handler.handle(self.record('dropped'))
+        threading.Timer(0.05, handler.writing.set).start()
+        handler.handle(self.record('sampled'))
+        handler.close()
+
+        self.assertEqual(self.messages(handler), ['in progress',
+            '2 log records dropped, the log queue was full', 'queued', 'sampled'])
+
+    def test_block_level(self):
+        """AsyncHandlerMixin should never drop log records at or above block_level."""
+        handler = AsyncListHandler(queue_size=1, full_policy='drop')
+        self.fill_queue(handler)
+        threading.Timer(0.05, handler.writing.set).start()
+        handler.handle(self.record('error', logging.ERROR))
+        handler.close()
+
+        self.assertEqual(self.messages(handler), ['in progress', 'queued', 'error'])
+
+    def test_unknown_policy(self):
+        """AsyncHandlerMixin should raise a ValueError for unknown full policies."""
+        self.assertRaises(ValueError, AsyncListHandler, full_policy='nope')
+
+    def test_restarts_after_fork(self):
+        """AsyncHandlerMixin should start a new background thread in a forked process."""
+        handler = AsyncListHandler()
+        handler.handle(self.record())
+        handler.flush()
+        thread = handler.thread
+
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            handler.handle(self.record())
+            handler.flush()
+            self.assertNotEqual(handler.thread, thread)
+            handler.close()
+
+        self.assertEqual(len(handler.records), 2)
+
+
+class AsyncRotatingFileHandlerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'app.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_writes_to_file(self):
+        """AsyncRotatingFileHandler should write log records to the file."""
+        handler = AsyncRotatingFileHandler(filename=self.filename, maxBytes=1024, backupCount=1)
+        handler.handle(logging.makeLogRecord({'msg': 'message'}))
+        handler.close()
+
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), 'message\n')
+
+
+class BufferedRotatingFileHandlerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'app.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def handler(self, **kwargs):
+        options = {'filename': self.filename, 'buffer_size': 1024, 'flush_interval': 60}
+        options.update(kwargs)
+        handler = BufferedRotatingFileHandler(**options)
+        self.addCleanup(handler.close)
+        return handler
+
+    def log(self, handler, msg='message', level=logging.INFO):
+        handler.handle(logging.makeLogRecord({'msg': msg, 'levelno': level}))
+
+    def contents(self, filename=None):
+        with open(filename or self.filename) as f:
+            return f.read()
+
+    def test_buffers_records(self):
+        """BufferedRotatingFileHandler should not write log records until the buffer is full."""
+        handler = self.handler()
+        self.log(handler)
+
+        self.assertEqual(self.contents(), '')
+
+    def test_writes_when_buffer_is_full(self):
+        """BufferedRotatingFileHandler should write the buffer when it reaches buffer_size."""
+        handler = self.handler(buffer_size=16)
+        self.log(handler)
+        self.log(handler)
+
+        self.assertEqual(self.contents(), 'message\nmessage\n')
+
+    def test_writes_on_errors(self):
+        """BufferedRotatingFileHandler should write the buffer straight away for errors."""
+        handler = self.handler()
+        self.log(handler)
+        self.log(handler, 'boom', logging.ERROR)
+
+        self.assertEqual(self.contents(), 'message\nboom\n')
+
+    def test_writes_after_flush_interval(self):
+        """BufferedRotatingFileHandler should write the buffer after flush_interval seconds."""
+        handler = self.handler(flush_interval=0.01)
+        self.log(handler)
+        time.sleep(0.1)
+
+        self.assertEqual(self.contents(), 'message\n')
+
+    def test_close_writes_buffer(self):
+        """BufferedRotatingFileHandler.close should write the buffer."""
+        handler = self.handler()
+        self.log(handler)
+        handler.close()
+
+        self.assertEqual(self.contents(), 'message\n')
+
+    def test_forked_process_drops_parent_buffer(self):
+        """BufferedRotatingFileHandler should not write the parent's buffered records in a forked process."""
+        handler = self.handler()
+        self.log(handler, 'parent')
+        # The parent's timer doesn't exist in a real forked process.
+        self.addCleanup(handler.timer.cancel)
+
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.log(handler, 'child')
+            handler.flush()
+
+        self.assertEqual(self.contents(), 'child\n')
+
+    def test_forked_process_closes_without_parent_buffer(self):
+        """BufferedRotatingFileHandler should not write the parent's buffered records when a forked process exits."""
+        handler = self.handler()
+        self.log(handler, 'parent')
+        self.addCleanup(handler.timer.cancel)
+
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            # logging.shutdown flushes and closes the handlers at exit.
+            handler.flush()
+            handler.close()
+
+        self.assertEqual(self.contents(), '')
+
+    def test_rotates_at_max_bytes(self):
+        """BufferedRotatingFileHandler should roll the file over before it reaches maxBytes."""
+        handler = self.handler(maxBytes=21, backupCount=1)
+        for i in range(3):
+            self.log(handler, 'message %d' % i)
+        handler.flush()
+
+        self.assertEqual(self.contents(self.filename + '.1'), 'message 0\nmessage 1\n')
+        self.assertEqual(self.contents(), 'message 2\n')
+
+    def test_async(self):
+        """AsyncBufferedRotatingFileHandler should write buffered log records from a background thread."""
+        handler = AsyncBufferedRotatingFileHandler(filename=self.filename, maxBytes=1024, backupCount=1)
+        self.log(handler)
+        handler.close()
+
+        self.assertEqual(self.contents(), 'message\n')
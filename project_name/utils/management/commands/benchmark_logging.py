@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+
+import json
+import logging
+import timeit
+import datetime
+import decimal
+import uuid
+import Cookie
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest, HttpResponse
+from django.test.client import RequestFactory
+
+from ... import json as encoders
+from ...json import ExtendedJSONEncoder
+from ...logging.formatters import JSONFormatter
+
+
+class IsinstanceChainEncoder(json.JSONEncoder):
+    """
+    The isinstance chain ExtendedJSONEncoder.default used to walk for every
+    object. Kept as a baseline to measure the dispatch table against.
+    """
+    chain = (
+        (datetime.datetime, encoders.encode_datetime),
+        (datetime.date, encoders.encode_date),
+        (datetime.time, encoders.encode_time),
+        (decimal.Decimal, str),
+        (uuid.UUID, str),
+        (Cookie.SimpleCookie, encoders.encode_simplecookie),
+        (HttpRequest, encoders.encode_httprequest),
+        (HttpResponse, encoders.encode_httpresponse),
+    )
+
+    def default(self, o):
+        for type_, fn in self.chain:
+            if isinstance(o, type_):
+                return fn(o)
+        return super(IsinstanceChainEncoder, self).default(o)
+
+
+class DictJSONFormatter(JSONFormatter):
+    """
+    Formats LogRecords the way JSONFormatter used to, by building the nested
+    dictionaries and passing them to json.dumps with a new encoder each time.
+    """
+    def format(self, record):
+        record.message = record.getMessage()
+        record.asctime = self.formatDate(record.created)
+        return json.dumps(self.fill_layout(record), cls=self.json_encoder)
+
+
+class Command(BaseCommand):
+    help = ('Measures the throughput of the JSON encoder and the JSON '
+        'formatter used for logging.')
+    args = '[encoder|formatter ...]'
+
+    option_list = BaseCommand.option_list + (
+        make_option('-n', '--number', type='int', default=10000,
+            help='How many payloads or records to format per run.'),
+        make_option('-r', '--repeat', type='int', default=3,
+            help='How many runs to take the best time from.'),
+    )
+
+    def payload(self):
+        """A mixed payload similar to the `extra` of a request log record."""
+        request = RequestFactory().get('/', HTTP_USER_AGENT='benchmark')
+        request.id = uuid.uuid4()
+        return {
+            'request': request,
+            'response': HttpResponse(),
+            'when': datetime.datetime(2012, 11, 26, 17, 28, 40, 56808),
+            'day': datetime.date(2012, 11, 26),
+            'total': decimal.Decimal('1.51'),
+            'ids': [uuid.uuid4() for i in range(5)],
+        }
+
+    def record(self):
+        """A LogRecord with a couple of `extra` parameters."""
+        logger = logging.getLogger('benchmark')
+        return logger.makeRecord('benchmark', logging.INFO, __file__, 10,
+            'the task with id #%d failed', (101,), None,
+            extra={'ip': '127.0.0.1', 'id': 10})
+
+    def handle(self, *args, **options):
+        benchmarks = {
+            'encoder': self.benchmark_encoder,
+            'formatter': self.benchmark_formatter,
+        }
+        names = args or ('encoder', 'formatter')
+        for name in names:
+            if name not in benchmarks:
+                raise CommandError('Unknown benchmark %r, choose from: %s' % (
+                    name, ', '.join(sorted(benchmarks))))
+
+        for name in names:
+            self.stdout.write('%s\n' % name)
+            benchmarks[name](options['number'], options['repeat'])
+
+    def benchmark_encoder(self, number, repeat):
+        payload = self.payload()
+        for name, encoder in (('isinstance', IsinstanceChainEncoder()),
+                              ('dispatch', ExtendedJSONEncoder())):
+            self.report(name, lambda: encoder.encode(payload), number, repeat)
+
+    def benchmark_formatter(self, number, repeat):
+        record = self.record()
+        for name, formatter in (('dict', DictJSONFormatter()),
+                                ('template', JSONFormatter())):
+            self.report(name, lambda: formatter.format(record), number, repeat)
+
+    def report(self, name, fn, number, repeat):
+        """Writes out how many times per second `fn` can be called."""
+        best = min(timeit.Timer(fn).repeat(repeat=repeat, number=number))
+        self.stdout.write('  %-12s %10.0f per second  %8.2f us each\n' % (
+            name, number / best, best / number * 1e6))
@@ -0,0 +1,143 @@
+from __future__ import absolute_import
+
+import multiprocessing
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.template import Template, Context
+from django.template.loaders.app_directories import app_template_dirs
+from compressor.cache import get_offline_hexdigest, write_offline_manifest
+from compressor.management.commands.compress import Command as CompressCommand
+from compressor.utils import get_class
+
+from ... import compress
+from ...warmup import template_files
+
+# The blocks being compressed, set before the worker processes are forked so
+# each job only needs the index of its block.
+_blocks = []
+
+
+def compress_block(index):
+    """Compresses a block, returns its index, the result and an error message."""
+    template_name, node = _blocks[index]
+    try:
+        result = node.render(Context(settings.COMPRESS_OFFLINE_CONTEXT), forced=True)
+    except Exception as e:
+        return index, None, '%s: %s' % (template_name, e)
+    return index, result, None
+
+
+class Command(CompressCommand):
+    help = ('Compresses the compress blocks of the templates in parallel like '
+        'the compress command, skipping the blocks whose markup and files '
+        'have not changed since the last run.')
+
+    option_list = CompressCommand.option_list + (
+        make_option('-j', '--jobs', type='int', default=multiprocessing.cpu_count(),
+            help='How many blocks to compress at the same time.'),
+        make_option('--rebuild', action='store_true', default=False,
+            help='Compress every block, even the unchanged ones.'),
+    )
+
+    def find_blocks(self, extensions):
+        """Returns (template name, node) for each compress block in the templates."""
+        blocks = []
+        template_dirs = list(settings.TEMPLATE_DIRS) + list(app_template_dirs)
+        for path, name in template_files(extensions, template_dirs):
+            try:
+                with open(path) as f:
+                    template = Template(f.read().decode(settings.FILE_CHARSET))
+            except Exception:
+                # Like the compress command, skip what isn't a valid template.
+                continue
+            for node in self.walk_nodes(template):
+                blocks.append((name, node))
+        return blocks
+
+    def handle_noargs(self, **options):
+        if not settings.COMPRESS_ENABLED and not options.get('force'):
+            raise CommandError('Compressor is disabled. Set COMPRESS_ENABLED '
+                'to True or use --force.')
+        extensions = tuple('.' + extension.lstrip('.') for extension in
+            options.get('extensions') or ['html'])
+        verbosity = int(options['verbosity'])
+
+        blocks = self.find_blocks(extensions)
+        if not blocks:
+            raise CommandError('No compress blocks were found in the templates.')
+
+        sources = compress.SourcesManifest()
+        if not options['rebuild']:
+            sources.load()
+
+        manifest = {}
+        pending = {}
+        for index, (name, node) in enumerate(blocks):
+            content = node.nodelist.render(Context(settings.COMPRESS_OFFLINE_CONTEXT))
+            key = get_offline_hexdigest(content)
+            if key in manifest or key in pending:
+                continue
+            compressor_class = get_class(getattr(settings,
+                'COMPRESS_%s_COMPRESSOR' % node.kind.upper()))
+            source = compress.source_hash(compressor_class(content))
+            result = sources.get(key, source)
+            if result is None:
+                pending[key] = index, source
+            else:
+                manifest[key] = result
+                if verbosity > 1:
+                    self.stdout.write('Unchanged block in %s\n' % name)
+
+        reused = len(manifest)
+        keys = list(pending)
+        outcomes = self.compress_blocks(blocks, [pending[key][0] for key in keys],
+            options['jobs'])
+        errors = []
+        for key, (index, result, error) in zip(keys, outcomes):
+            if error:
+                errors.append(error)
+                continue
+            manifest[key] = result
+            sources.set(key, pending[key][1], result)
+            if verbosity > 1:
+                self.stdout.write('Compressed block in %s\n' % blocks[index][0])
+
+        if errors:
+            raise CommandError('Compressing %d block(s) failed:\n%s' % (
+                len(errors), '\n'.join(errors)))
+
+        write_offline_manifest(manifest)
+        sources.retain(manifest)
+        sources.save()
+        self.stdout.write('Compressed %d block(s) and reused %d unchanged block(s) '
+            'from %d template(s).\n' % (len(keys), reused,
+            len(set(name for name, node in blocks))))
+
+    def compress_blocks(self, blocks, indexes, jobs):
+        """
+        Compresses the blocks at `indexes` in a pool of `jobs` processes, with
+        one nailgun server running Closure Compiler for all of them when it's
+        installed. Returns (index, result, error) for each block, in order.
+        """
+        if not indexes:
+            return []
+        _blocks[:] = blocks
+        server = None
+        if compress.NailgunServer.available():
+            server = compress.NailgunServer()
+            server.start()
+        try:
+            if jobs > 1 and len(indexes) > 1:
+                pool = multiprocessing.Pool(min(jobs, len(indexes)))
+                try:
+                    return pool.map(compress_block, indexes)
+                finally:
+                    pool.terminate()
+                    pool.join()
+            return map(compress_block, indexes)
+        finally:
+            if server is not None:
+                server.stop()
+            del _blocks[:]
@@ -0,0 +1,59 @@
+from __future__ import absolute_import
+
+import fnmatch
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.base import Template
+from django.template.loader import make_origin
+from django.template.loaders.app_directories import app_template_dirs
+
+from ...warmup import template_files, TEMPLATE_EXTENSIONS
+
+
+class Command(BaseCommand):
+    help = ('Compiles every template in TEMPLATE_DIRS and the template '
+        'directories of the installed apps, and fails when any of them has '
+        'a syntax error. Run it at deploy time.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('-e', '--extension', action='append', dest='extensions',
+            help='The extensions of the templates to compile, defaults to '
+                '%s. Can be given more than once.' % ', '.join(TEMPLATE_EXTENSIONS)),
+        make_option('-i', '--ignore', action='append', default=[], metavar='PATTERN',
+            help='Skip the templates whose names match this glob-style '
+                'pattern. Can be given more than once.'),
+    )
+
+    def handle(self, *args, **options):
+        extensions = tuple('.' + extension.lstrip('.') for extension in
+            options['extensions'] or TEMPLATE_EXTENSIONS)
+        verbosity = int(options['verbosity'])
+        template_dirs = list(settings.TEMPLATE_DIRS) + list(app_template_dirs)
+
+        compiled = 0
+        errors = []
+        for path, name in template_files(extensions, template_dirs):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in options['ignore']):
+                continue
+            try:
+                self.compile(path, name)
+            except Exception as e:
+                errors.append((path, e))
+                self.stderr.write('%s: %s\n' % (path, e))
+            else:
+                compiled += 1
+                if verbosity > 1:
+                    self.stdout.write('Compiled %s\n' % path)
+
+        if errors:
+            raise CommandError('%d of %d templates failed to compile.' % (
+                len(errors), compiled + len(errors)))
+        if verbosity:
+            self.stdout.write('Compiled %d templates.\n' % compiled)
+
+    def compile(self, path, name):
+        with open(path) as f:
+            source = f.read().decode(settings.FILE_CHARSET)
+        return Template(source, make_origin(path, None, name, None), name)
@@ -0,0 +1,101 @@
+from __future__ import absolute_import
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import importtime
+
+
+class Command(BaseCommand):
+    help = ('Boots the project in a new process the way wsgi.py, manage.py '
+        'or a Celery worker does and reports how long importing each module '
+        'and each installed app took.')
+    args = '[wsgi|manage|celery]'
+
+    option_list = BaseCommand.option_list + (
+        make_option('-m', '--min-ms', type='float', default=1.0,
+            help='Leave the modules that took less than this many '
+                'milliseconds out of the import tree.'),
+        make_option('-d', '--depth', type='int', default=None,
+            help='How many levels of the import tree to show.'),
+    )
+
+    def handle(self, entry='wsgi', *args, **options):
+        if entry not in importtime.ENTRY_POINTS:
+            raise CommandError('Unknown entry point %r, choose from: %s' % (
+                entry, ', '.join(sorted(importtime.ENTRY_POINTS))))
+
+        report = self.profile(entry)
+        self.write_summary(report)
+        self.write_apps(report)
+        self.write_tree(report, options['min_ms'] / 1000.0, options['depth'])
+        self.write_dev_only_apps(report)
+
+    def profile(self, entry):
+        """Boots the project in a new process and returns its report."""
+        wsgi_module = '%s.wsgi' % __name__.split('.')[0]
+        env = dict(os.environ,
+            DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+            PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+
+        fd, output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            returncode = subprocess.call([sys.executable, '-m',
+                importtime.__name__, entry, output, wsgi_module], env=env)
+            if returncode:
+                raise CommandError('Booting the project failed.')
+            with open(output) as f:
+                return json.load(f)
+        finally:
+            os.remove(output)
+
+    def write_summary(self, report):
+        modules = sum(1 for item in importtime.iter_nodes(report['tree']))
+        self.stdout.write('Booting %s with %s imported %d modules in %.1fms, '
+            '%.1fms of which was spent importing.\n\n' % (report['entry'],
+            report['settings'], modules, report['elapsed'] * 1000,
+            report['tree']['cumulative'] * 1000))
+
+    def write_apps(self, report):
+        self.stdout.write('Installed apps, not counting the other apps they import:\n')
+        for app, seconds, count in importtime.app_times(report['tree'],
+                report['installed_apps']):
+            self.stdout.write('  %9.1fms  %4d modules  %s\n' % (seconds * 1000, count, app))
+        self.stdout.write('\n')
+
+    def write_tree(self, report, min_seconds, max_depth):
+        self.stdout.write('Modules by cumulative import time (self time in brackets):\n')
+
+        def write(node, depth):
+            children = sorted(node['children'], key=lambda child: child['cumulative'],
+                reverse=True)
+            for child in children:
+                if child['cumulative'] < min_seconds:
+                    break
+                self.stdout.write('  %9.1fms (%7.1fms)  %s%s\n' % (
+                    child['cumulative'] * 1000, child['self'] * 1000,
+                    '  ' * depth, child['name']))
+                if max_depth is None or depth + 1 < max_depth:
+                    write(child, depth + 1)
+
+        write(report['tree'], 0)
+
+    def write_dev_only_apps(self, report):
+        """Warns about the DEV_ONLY_APPS that get imported when DEBUG is off."""
+        if report['debug']:
+            return
+        times = dict((app, seconds) for app, seconds, count in importtime.app_times(
+            report['tree'], report['dev_only_apps']))
+        loaded = [app for app in report['dev_only_apps'] if app in times]
+        if loaded:
+            self.stdout.write('\nDevelopment apps imported with DEBUG = False:\n')
+            for app in loaded:
+                self.stdout.write('  %9.1fms  %s\n' % (times[app] * 1000, app))
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+import time
+from optparse import make_option
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction, router
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired sessions from the database in batches, so the '
+        'session table isn\'t locked by one large DELETE.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('-b', '--batch-size', type='int', default=1000,
+            help='How many sessions to delete per batch.'),
+        make_option('-s', '--sleep', type='float', default=0,
+            help='Seconds to wait between batches.'),
+    )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        using = router.db_for_write(Session)
+        expired = Session.objects.using(using).filter(expire_date__lt=now)
+
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                break
+
+            with transaction.commit_on_success(using=using):
+                Session.objects.using(using).filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            if int(options['verbosity']) > 1:
+                self.stdout.write('Deleted %d expired sessions\n' % deleted)
+
+            if len(keys) < batch_size:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write('Deleted %d expired sessions in total\n' % deleted)
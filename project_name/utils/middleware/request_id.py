@@ -1,29 +1,157 @@
+import os
+import re
+import time
 import uuid
+import random
 import logging
+import itertools
+import threading
 
 from django.conf import settings
+from django.utils.importlib import import_module
+
+
+_local = threading.local()
+
+
+def get_request_id():
+    """
+    Returns the ID of the request being handled by the current thread, or
+    None outside of a request.
+    """
+    return getattr(_local, 'request_id', None)
+
+
+def set_request_id(request_id):
+    """Sets the request ID returned by get_request_id for the current thread."""
+    _local.request_id = request_id
+
+
+def uuid4_request_id():
+    """Returns a random UUID, this reads from os.urandom on every call."""
+    return str(uuid.uuid4())
+
+
+class CounterRequestIdGenerator(object):
+    """
+    Generates IDs from a random prefix and a counter, for example
+    `1c7b5522ccec4506-2a`.
+
+    The prefix is picked again in each process so forked workers don't hand
+    out the same IDs.
+    """
+    def __init__(self):
+        self.pid = None
+
+    def __call__(self):
+        if self.pid != os.getpid():
+            self.prefix = uuid.uuid4().hex[:16]
+            self.counter = itertools.count(1)
+            self.pid = os.getpid()
+        return '%s-%x' % (self.prefix, next(self.counter))
+
+
+class TimeOrderedRequestIdGenerator(object):
+    """
+    Generates UUIDv7 style IDs, for example
+    `013b8a3c-2f5e-7a1c-9d2e-4b6f8a0c1e3d`.
+
+    The first 48 bits are the time in milliseconds so the IDs sort by the
+    time the request started, which keeps them cheap to index. The rest are
+    random bits from a generator seeded once per process, instead of reading
+    os.urandom for every ID.
+    """
+    def __init__(self):
+        self.pid = None
+
+    def __call__(self):
+        if self.pid != os.getpid():
+            self.random = random.Random(os.urandom(16))
+            self.pid = os.getpid()
+
+        timestamp = int(time.time() * 1000) & 0xffffffffffff
+        rand_a = self.random.getrandbits(12)
+        rand_b = self.random.getrandbits(62)
+        value = (timestamp << 80) | (0x7 << 76) | (rand_a << 64) | (0x2 << 62) | rand_b
+        digits = '%032x' % value
+        return '%s-%s-%s-%s-%s' % (digits[:8], digits[8:12], digits[12:16], digits[16:20], digits[20:])
+
+
+counter_request_id = CounterRequestIdGenerator()
+time_ordered_request_id = TimeOrderedRequestIdGenerator()
+
+
+def get_generator(generator):
+    """Returns the ID generator for a callable or a dotted path to one."""
+    if callable(generator):
+        return generator
+
+    module, name = generator.rsplit('.', 1)
+    return getattr(import_module(module), name)
 
 
 class RequestIdMiddleware(object):
     """
-    Add a unique ID to each request. The ID is generated using a uuid.
+    Add a unique ID to each request. By default the ID is a time ordered
+    UUIDv7 style ID, see the REQUEST_ID_GENERATOR setting.
 
     This middleware is useful when trying to trace a request through the logs.
 
     If you are using the JSONFormatter for logging and you include a request
     object in your `extra` dictionary passed to logging calls, this ID will be
     displayed in the final JSON output.
+
+    The ID is stored as a string so it doesn't need converting again for the
+    response header or the logs.
+
+    The REQUEST_ID_GENERATOR setting is a function, or the dotted path to a
+    function, that takes no arguments and returns a new ID. This module
+    provides:
+
+    time_ordered_request_id - UUIDv7 style IDs that sort by time, the default.
+    counter_request_id - A random prefix per process and a counter, the
+        cheapest to generate.
+    uuid4_request_id - Random UUIDs.
+
+    When the REQUEST_ID_TRUST_HEADER setting is True an ID sent in the
+    REQUEST_ID_HEADER of the request is used instead of generating one, as
+    long as it looks like an ID. Only turn this on when a load balancer or
+    proxy in front of the site sets or strips the header.
+
+    The ID of the current request is also available from get_request_id().
     """
-    def __init__(self, REQUEST_ID_HEADER='X-REQUEST-ID', logger=None):
+    valid_request_id = re.compile(r'^[A-Za-z0-9._:-]{1,128}\Z')
+
+    def __init__(self, REQUEST_ID_HEADER='X-REQUEST-ID', logger=None,
+            REQUEST_ID_GENERATOR=time_ordered_request_id, REQUEST_ID_TRUST_HEADER=False):
         self.REQUEST_ID_HEADER = getattr(settings, 'REQUEST_ID_HEADER', REQUEST_ID_HEADER)
+        self.REQUEST_ID_GENERATOR = getattr(settings, 'REQUEST_ID_GENERATOR', REQUEST_ID_GENERATOR)
+        self.REQUEST_ID_TRUST_HEADER = getattr(settings, 'REQUEST_ID_TRUST_HEADER', REQUEST_ID_TRUST_HEADER)
+        self.generate_id = get_generator(self.REQUEST_ID_GENERATOR)
+
+        self.META_KEY = None
+        if self.REQUEST_ID_HEADER and self.REQUEST_ID_TRUST_HEADER:
+            self.META_KEY = 'HTTP_' + self.REQUEST_ID_HEADER.upper().replace('-', '_')
 
         self.logger = logger
         if not logger:
             self.logger = logging.getLogger(__name__)
 
     def process_request(self, request):
-        """Add request.id as a new random UUID."""
-        request.id = uuid.uuid4()
+        """Add request.id as the trusted ID from the request or a new ID."""
+        request_id = None
+        if self.META_KEY:
+            request_id = request.META.get(self.META_KEY)
+
+        if request_id and self.valid_request_id.match(request_id):
+            request.id = request_id
+        else:
+            request.id = self.generate_id()
+        set_request_id(request.id)
+
+        if request_id and request.id != request_id:
+            self.logger.warning('Invalid request id in %s header, generated a new one',
+                self.REQUEST_ID_HEADER, extra={'request': request})
 
     def process_response(self, request, response):
         """
@@ -46,4 +174,5 @@ class RequestIdMiddleware(object):
                     extra={'request': request, 'response': response}
                 )
 
+        set_request_id(None)
         return response
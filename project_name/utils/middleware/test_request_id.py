@@ -2,13 +2,18 @@ from django.utils import unittest
 from django.test.utils import override_settings
 import mock
 
+import os
 import uuid
 from django.http import HttpResponse, HttpRequest
 
+from . import request_id
 from .request_id import RequestIdMiddleware
 
 
 class RequestIdMiddlewareTests(unittest.TestCase):
+    def tearDown(self):
+        request_id.set_request_id(None)
+
     def get_process_response(self, request_id='requestid', request=None, response=None, rim=None):
         """
         Builds up the required objects to pass to
@@ -38,13 +43,89 @@ class RequestIdMiddlewareTests(unittest.TestCase):
                 request_id)
 
     def test_process_request_adds_id(self):
-        """RequestIdMiddleware should add a UUID to the requests as the `id` attribute."""
+        """RequestIdMiddleware should add a time ordered UUID string to the requests as the `id` attribute."""
+        rim = RequestIdMiddleware()
+        request = mock.MagicMock()
+
+        rim.process_request(request)
+
+        self.assertIsInstance(request.id, str)
+        self.assertEqual(uuid.UUID(request.id).version, 7)
+
+    @override_settings(REQUEST_ID_GENERATOR='{0}.uuid4_request_id'.format(request_id.__name__))
+    def test_process_request_uses_generator_setting(self):
+        """RequestIdMiddleware should generate IDs with the REQUEST_ID_GENERATOR setting."""
         rim = RequestIdMiddleware()
         request = mock.MagicMock()
 
         rim.process_request(request)
 
-        self.assertIsInstance(request.id, uuid.UUID)
+        self.assertEqual(uuid.UUID(request.id).version, 4)
+
+    def test_process_request_uses_generator_callable(self):
+        """RequestIdMiddleware should accept a function as the ID generator."""
+        rim = RequestIdMiddleware(REQUEST_ID_GENERATOR=lambda: 'custom')
+        request = mock.MagicMock()
+
+        rim.process_request(request)
+
+        self.assertEqual(request.id, 'custom')
+
+    def test_process_request_sets_current_request_id(self):
+        """RequestIdMiddleware should make the request id available from get_request_id()."""
+        rim = RequestIdMiddleware()
+        request = HttpRequest()
+
+        rim.process_request(request)
+        self.assertEqual(request_id.get_request_id(), request.id)
+
+        rim.process_response(request, HttpResponse())
+        self.assertEqual(request_id.get_request_id(), None)
+
+    def test_process_request_ignores_header_by_default(self):
+        """RequestIdMiddleware should not use the request id sent with the request by default."""
+        rim = RequestIdMiddleware()
+        request = HttpRequest()
+        request.META['HTTP_X_REQUEST_ID'] = 'inbound'
+
+        rim.process_request(request)
+
+        self.assertNotEqual(request.id, 'inbound')
+
+    @override_settings(REQUEST_ID_TRUST_HEADER=True)
+    def test_process_request_uses_trusted_header(self):
+        """RequestIdMiddleware should use the request id sent with the request when it's trusted."""
+        rim = RequestIdMiddleware()
+        request = HttpRequest()
+        request.META['HTTP_X_REQUEST_ID'] = 'inbound-1.2:3_4'
+
+        rim.process_request(request)
+
+        self.assertEqual(request.id, 'inbound-1.2:3_4')
+
+    @override_settings(REQUEST_ID_TRUST_HEADER=True)
+    def test_process_request_rejects_invalid_header(self):
+        """RequestIdMiddleware should generate a new request id when the one sent doesn't look like an id."""
+        mock_logger = mock.MagicMock()
+        rim = RequestIdMiddleware(logger=mock_logger)
+        request = HttpRequest()
+        request.META['HTTP_X_REQUEST_ID'] = '<script>'
+
+        rim.process_request(request)
+
+        self.assertNotEqual(request.id, '<script>')
+        self.assertTrue(mock_logger.warning.called)
+
+    @override_settings(REQUEST_ID_TRUST_HEADER=True)
+    def test_process_request_rejects_trailing_newline(self):
+        """RequestIdMiddleware should not accept a request id sent with a trailing newline."""
+        rim = RequestIdMiddleware(logger=mock.MagicMock())
+        request = HttpRequest()
+        request.META['HTTP_X_REQUEST_ID'] = 'inbound\n'
+
+        rim.process_request(request)
+
+        self.assertNotEqual(request.id, 'inbound\n')
 
     def test_process_response_adds_header(self):
         """RequestIdMiddleware should add a header to the response with the request id as the value."""
@@ -88,3 +169,43 @@ class RequestIdMiddlewareTests(unittest.TestCase):
         response, header, request_id = self.get_process_response(response=response, rim=rim)
 
         self.assertTrue(mock_logger.warning.called)
+
+
+class RequestIdGeneratorTests(unittest.TestCase):
+    def test_uuid4_request_id(self):
+        """uuid4_request_id should return random UUID strings."""
+        self.assertEqual(uuid.UUID(request_id.uuid4_request_id()).version, 4)
+
+    def test_counter_request_id(self):
+        """CounterRequestIdGenerator should return IDs with the same prefix and an increasing counter."""
+        generator = request_id.CounterRequestIdGenerator()
+        first, second = generator(), generator()
+
+        self.assertEqual(first.split('-')[0], second.split('-')[0])
+        self.assertEqual(int(second.split('-')[1], 16), int(first.split('-')[1], 16) + 1)
+
+    def test_counter_request_id_after_fork(self):
+        """CounterRequestIdGenerator should pick a new prefix in a forked process."""
+        generator = request_id.CounterRequestIdGenerator()
+        first = generator()
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            second = generator()
+
+        self.assertNotEqual(first.split('-')[0], second.split('-')[0])
+
+    def test_time_ordered_request_id(self):
+        """TimeOrderedRequestIdGenerator should return valid UUIDv7 strings."""
+        id = uuid.UUID(request_id.TimeOrderedRequestIdGenerator()())
+
+        self.assertEqual(id.version, 7)
+        self.assertEqual(id.variant, uuid.RFC_4122)
+
+    def test_time_ordered_request_id_sorts_by_time(self):
+        """TimeOrderedRequestIdGenerator should return IDs that sort by time."""
+        generator = request_id.TimeOrderedRequestIdGenerator()
+        with mock.patch('time.time', return_value=1353454259.111):
+            first = generator()
+        with mock.patch('time.time', return_value=1353454259.112):
+            second = generator()
+
+        self.assertTrue(first < second)
@@ -0,0 +1,139 @@
+from django.utils import unittest
+from django.test.utils import override_settings
+import os
+import shutil
+import tempfile
+
+import mock
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from django.template import Template, Context
+
+from .timing import TimingMiddleware, get_timer
+
+
+class TimingMiddlewareTests(unittest.TestCase):
+    def setUp(self):
+        self.logger = mock.MagicMock()
+        self.tm = TimingMiddleware(logger=self.logger)
+
+    def request(self, view=None):
+        """Runs a request through the middleware, calling `view` in between."""
+        request = HttpRequest()
+        request.method = 'GET'
+        request.path_info = '/'
+        self.tm.process_request(request)
+        if view:
+            view()
+        self.tm.process_response(request, HttpResponse())
+        return request
+
+    def timing(self):
+        return self.logger.info.call_args[1]['extra']['timing']
+
+    def test_logs_timings(self):
+        """TimingMiddleware should log the timings of the request."""
+        request = self.request()
+
+        extra = self.logger.info.call_args[1]['extra']
+        self.assertEqual(extra['request'], request)
+        self.assertEqual(extra['status_code'], 200)
+        self.assertEqual(sorted(extra['timing']), ['cpu_ms', 'queries', 'query_ms',
+            'spans', 'template_ms', 'templates', 'wall_ms'])
+
+    def test_counts_queries(self):
+        """TimingMiddleware should count the database queries run during the request."""
+        self.request(lambda: connection.cursor().execute('SELECT 1'))
+
+        self.assertEqual(self.timing()['queries'], 1)
+
+    def test_keeps_debug_cursors(self):
+        """TimingMiddleware should not stop connection.queries from recording queries."""
+        self.request()
+        connection.use_debug_cursor = True
+        try:
+            connection.queries = []
+            connection.cursor().execute('SELECT 1')
+            self.assertEqual(len(connection.queries), 1)
+        finally:
+            connection.use_debug_cursor = None
+
+    def test_ignores_queries_outside_of_requests(self):
+        """TimingMiddleware should not count queries once the request is finished."""
+        self.request()
+        connection.cursor().execute('SELECT 1')
+
+        self.assertEqual(get_timer(), None)
+        self.assertEqual(self.timing()['queries'], 0)
+
+    def test_times_templates(self):
+        """TimingMiddleware should time template rendering."""
+        self.request(lambda: Template('text').render(Context()))
+
+        self.assertEqual(self.timing()['templates'], 1)
+
+    def test_adds_server_timing_header(self):
+        """TimingMiddleware should add a Server-Timing header to the response."""
+        request = HttpRequest()
+        self.tm.process_request(request)
+        response = self.tm.process_response(request, HttpResponse())
+
+        self.assertTrue(response['Server-Timing'].startswith('total;dur='))
+
+    def test_server_timing_header_setting(self):
+        """TimingMiddleware should not add a Server-Timing header when SERVER_TIMING_HEADER is False."""
+        with override_settings(SERVER_TIMING_HEADER=False):
+            tm = TimingMiddleware(logger=self.logger)
+        request = HttpRequest()
+        tm.process_request(request)
+        response = tm.process_response(request, HttpResponse())
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_does_not_profile_by_default(self):
+        """TimingMiddleware should not profile requests by default."""
+        request = self.request()
+
+        self.assertEqual(request.profiler, None)
+
+
+class TimingMiddlewareProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_profiles_requests(self):
+        """TimingMiddleware should save profiles of sampled requests."""
+        with override_settings(REQUEST_PROFILE_RATE=1, REQUEST_PROFILE_DIR=self.dir):
+            tm = TimingMiddleware(logger=mock.MagicMock())
+        request = HttpRequest()
+        request.id = 'requestid'
+        tm.process_request(request)
+        tm.process_response(request, HttpResponse())
+
+        files = os.listdir(self.dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith('-requestid.prof'))
+
+    def test_keeps_slowest_profiles(self):
+        """TimingMiddleware should only keep the profiles of the slowest requests."""
+        with override_settings(REQUEST_PROFILE_KEEP=2, REQUEST_PROFILE_DIR=self.dir):
+            tm = TimingMiddleware()
+        for wall_time, request_id in ((2, 'b'), (1, 'a'), (3, 'c'), (0.5, 'd')):
+            request = mock.Mock(id=request_id)
+            tm.keep_profile(request, mock.Mock(dump_stats=lambda f: open(f, 'w').close()), wall_time)
+
+        self.assertEqual(sorted(os.listdir(self.dir)),
+            ['00002000ms-b.prof', '00003000ms-c.prof'])
+
+    def test_keeps_no_profiles(self):
+        """TimingMiddleware should not save profiles when REQUEST_PROFILE_KEEP is 0."""
+        with override_settings(REQUEST_PROFILE_KEEP=0, REQUEST_PROFILE_DIR=self.dir):
+            tm = TimingMiddleware()
+        profiler = mock.Mock()
+        tm.keep_profile(mock.Mock(id='a'), profiler, 1)
+
+        self.assertFalse(profiler.dump_stats.called)
+        self.assertEqual(os.listdir(self.dir), [])
@@ -0,0 +1,123 @@
+from django.utils import unittest
+from django.test.utils import override_settings
+import time
+
+import mock
+
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+
+from ..db import routers
+from ..db.routers import get_replica, ReplicaRouter
+from ..transaction import transactional, not_transactional
+from .transaction import SelectiveTransactionMiddleware
+
+
+def view(request):
+    return HttpResponse()
+
+
+@transactional
+def transactional_view(request):
+    return HttpResponse()
+
+
+@not_transactional
+def not_transactional_view(request):
+    return HttpResponse()
+
+
+class SelectiveTransactionMiddlewareTests(unittest.TestCase):
+    def setUp(self):
+        self.stm = SelectiveTransactionMiddleware()
+        # There is no 'replica' database to measure the lag of.
+        patcher = mock.patch.object(routers, 'replica_lag', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method='GET', path='/'):
+        request = HttpRequest()
+        request.method = method
+        request.path_info = path
+        return request
+
+    def is_managed(self, request, view_func=view, middleware=None):
+        """Returns whether `view_func` runs in a transaction for `request`."""
+        middleware = middleware or self.stm
+        middleware.process_view(request, view_func, (), {})
+        try:
+            return transaction.is_managed()
+        finally:
+            middleware.process_response(request, HttpResponse())
+
+    def test_safe_methods_autocommit(self):
+        """SelectiveTransactionMiddleware should not start transactions for GET requests."""
+        self.assertFalse(self.is_managed(self.request('GET')))
+        self.assertFalse(self.is_managed(self.request('HEAD')))
+
+    def test_unsafe_methods_are_transactional(self):
+        """SelectiveTransactionMiddleware should start transactions for POST requests."""
+        self.assertTrue(self.is_managed(self.request('POST')))
+        self.assertFalse(transaction.is_managed())
+
+    def test_transactional_views(self):
+        """SelectiveTransactionMiddleware should start transactions for views marked transactional."""
+        self.assertTrue(self.is_managed(self.request('GET'), transactional_view))
+        self.assertFalse(self.is_managed(self.request('POST'), not_transactional_view))
+
+    def test_transactional_urls(self):
+        """SelectiveTransactionMiddleware should start transactions for TRANSACTIONAL_URLS."""
+        with override_settings(TRANSACTIONAL_URLS=(r'^/checkout/',)):
+            stm = SelectiveTransactionMiddleware()
+
+        self.assertTrue(self.is_managed(self.request('GET', '/checkout/pay'), middleware=stm))
+        self.assertFalse(self.is_managed(self.request('GET', '/products/'), middleware=stm))
+
+    def test_rolls_back_on_exceptions(self):
+        """SelectiveTransactionMiddleware should leave the transaction when the view raises an exception."""
+        request = self.request('POST')
+        self.stm.process_view(request, view, (), {})
+        self.stm.process_exception(request, ValueError())
+
+        self.assertFalse(transaction.is_managed())
+
+    def test_read_only_requests_use_replicas(self):
+        """SelectiveTransactionMiddleware should send the reads of read-only requests to a replica."""
+        with override_settings(REPLICA_DATABASES=('replica',)):
+            request = self.request('GET')
+            self.stm.process_view(request, view, (), {})
+            self.assertEqual(get_replica(), 'replica')
+            self.stm.process_response(request, HttpResponse())
+
+            self.assertEqual(get_replica(), None)
+            request = self.request('GET')
+            self.stm.process_view(request, transactional_view, (), {})
+            self.assertEqual(get_replica(), None)
+            self.stm.process_response(request, HttpResponse())
+
+    def test_pins_to_primary_after_writes(self):
+        """SelectiveTransactionMiddleware should send reads to the primary for a while after a write."""
+        with override_settings(REPLICA_DATABASES=('replica',)):
+            request = self.request('POST')
+            self.stm.process_view(request, view, (), {})
+            ReplicaRouter().db_for_write(None)
+            response = self.stm.process_response(request, HttpResponse())
+            cookie = response.cookies['pin_primary']
+            self.assertEqual(cookie['max-age'], 5)
+
+            request = self.request('GET')
+            request.COOKIES['pin_primary'] = cookie.value
+            self.stm.process_view(request, view, (), {})
+            self.assertEqual(get_replica(), None)
+            self.stm.process_response(request, HttpResponse())
+
+    def test_pin_expires(self):
+        """SelectiveTransactionMiddleware should use replicas again once the pin expired."""
+        with override_settings(REPLICA_DATABASES=('replica',)):
+            request = self.request('GET')
+            request.COOKIES['pin_primary'] = str(time.time() - 1)
+            self.stm.process_view(request, view, (), {})
+            self.assertEqual(get_replica(), 'replica')
+            response = self.stm.process_response(request, HttpResponse())
+
+        self.assertFalse('pin_primary' in response.cookies)
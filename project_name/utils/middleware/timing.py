@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import heapq
+import random
+import logging
+import resource
+import threading
+import cProfile
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.util import CursorWrapper
+from django.template.base import Template
+
+
+_local = threading.local()
+
+# Characters that aren't allowed in Server-Timing metric names.
+invalid_metric_name = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+# Per thread CPU time where the platform supports it.
+RUSAGE = getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF)
+
+
+def cpu_time():
+    usage = resource.getrusage(RUSAGE)
+    return usage.ru_utime + usage.ru_stime
+
+
+def get_timer():
+    """Returns the RequestTimer of the current request or None."""
+    return getattr(_local, 'timer', None)
+
+
+class RequestTimer(object):
+    """Collects the timings of a single request."""
+    def __init__(self):
+        self.start = time.time()
+        self.start_cpu = cpu_time()
+        self.queries = 0
+        self.query_time = 0.0
+        self.templates = 0
+        self.template_time = 0.0
+        self.rendering = False
+        self.wall_time = None
+        self.cpu_time = None
+        # Maps span names to [total duration, count, description].
+        self.spans = OrderedDict()
+
+    def add_span(self, name, duration, description=None):
+        """Add `duration` seconds to the span called `name`."""
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [duration, 1, description]
+        else:
+            span[0] += duration
+            span[1] += 1
+
+    def stop(self):
+        self.wall_time = time.time() - self.start
+        self.cpu_time = cpu_time() - self.start_cpu
+
+    def as_dict(self):
+        """Returns the timings in milliseconds, ready to be logged."""
+        return {
+            'wall_ms': round(self.wall_time * 1000, 3),
+            'cpu_ms': round(self.cpu_time * 1000, 3),
+            'queries': self.queries,
+            'query_ms': round(self.query_time * 1000, 3),
+            'templates': self.templates,
+            'template_ms': round(self.template_time * 1000, 3),
+            'spans': dict((name, round(duration * 1000, 3))
+                for name, (duration, count, description) in self.spans.iteritems()),
+        }
+
+    def server_timing(self):
+        """Returns the timings as the value of a Server-Timing header."""
+        metrics = [
+            ('total', self.wall_time, None),
+            ('cpu', self.cpu_time, None),
+            ('sql', self.query_time, '%d queries' % self.queries),
+            ('tpl', self.template_time, '%d templates' % self.templates),
+        ]
+        for name, (duration, count, description) in self.spans.iteritems():
+            if description is None and count > 1:
+                description = '%d calls' % count
+            metrics.append((name, duration, description))
+
+        header = []
+        for name, duration, description in metrics:
+            metric = '%s;dur=%.1f' % (invalid_metric_name.sub('_', name), duration * 1000)
+            if description:
+                metric += ';desc="%s"' % description.replace('\\', '\\\\').replace('"', '\\"')
+            header.append(metric)
+        return ', '.join(header)
+
+
+class TimingCursorWrapper(CursorWrapper):
+    """Counts and times the queries run through a cursor."""
+    def execute(self, sql, params=()):
+        return self.timed(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self.timed(self.cursor.executemany, sql, param_list)
+
+    def timed(self, method, sql, params):
+        timer = get_timer()
+        if timer is None:
+            return method(sql, params)
+
+        start = time.time()
+        try:
+            return method(sql, params)
+        finally:
+            timer.queries += 1
+            timer.query_time += time.time() - start
+
+
+def instrument_connection(connection):
+    """
+    Make the connection hand out TimingCursorWrappers, around the cursors
+    it would hand out otherwise so connection.queries still works as usual.
+    """
+    if getattr(connection, 'timing_instrumented', False):
+        return
+
+    cursor = connection.cursor
+
+    def timing_cursor():
+        return TimingCursorWrapper(cursor(), connection)
+
+    connection.cursor = timing_cursor
+    connection.timing_instrumented = True
+
+
+def instrument_templates():
+    """
+    Time template rendering. Only the outermost render is timed, templates
+    rendered by the extends and include tags are part of it.
+    """
+    render = Template._render
+    if getattr(render, 'timed', False):
+        return
+
+    def timed_render(self, context):
+        timer = get_timer()
+        if timer is None or timer.rendering:
+            return render(self, context)
+
+        timer.rendering = True
+        start = time.time()
+        try:
+            return render(self, context)
+        finally:
+            timer.templates += 1
+            timer.template_time += time.time() - start
+            timer.rendering = False
+
+    timed_render.timed = True
+    Template._render = timed_render
+
+
+class TimingMiddleware(object):
+    """
+    Logs the wall time, CPU time, number of database queries, time spent on
+    database queries and time spent rendering templates for every request.
+
+    The timings are logged as one log record with the request and the
+    timings in `extra`, so with the JSONFormatter they end up next to the
+    request id. Put this right after RequestIdMiddleware so it covers the
+    rest of the middleware.
+
+    CPU time is for the thread handling the request when the platform can
+    tell, otherwise it's for the whole process.
+
+    The timings, along with any spans recorded with
+    `{{ project_name }}.utils.timing.span`, are also sent to the browser in
+    a Server-Timing header unless SERVER_TIMING_HEADER is False.
+
+    Requests can also be profiled with cProfile. REQUEST_PROFILE_RATE is the
+    fraction of requests to profile, 0 turns profiling off. Only the
+    profiles of the REQUEST_PROFILE_KEEP slowest requests seen by each
+    process are kept in REQUEST_PROFILE_DIR, named after the time the request
+    took and its id.
+    """
+    def __init__(self, REQUEST_PROFILE_RATE=0, REQUEST_PROFILE_KEEP=10,
+            REQUEST_PROFILE_DIR=None, SERVER_TIMING_HEADER=True, logger=None):
+        self.REQUEST_PROFILE_RATE = getattr(settings, 'REQUEST_PROFILE_RATE', REQUEST_PROFILE_RATE)
+        self.REQUEST_PROFILE_KEEP = getattr(settings, 'REQUEST_PROFILE_KEEP', REQUEST_PROFILE_KEEP)
+        self.REQUEST_PROFILE_DIR = getattr(settings, 'REQUEST_PROFILE_DIR', REQUEST_PROFILE_DIR)
+        if not self.REQUEST_PROFILE_DIR:
+            self.REQUEST_PROFILE_DIR = os.path.join(getattr(settings, 'VAR_ROOT', 'var'), 'log', 'profiles')
+        self.SERVER_TIMING_HEADER = getattr(settings, 'SERVER_TIMING_HEADER', SERVER_TIMING_HEADER)
+
+        self.logger = logger
+        if not logger:
+            self.logger = logging.getLogger(__name__)
+
+        # A min heap of (wall time, filename) of the profiles that are kept.
+        self.profiles = []
+        self.profiles_lock = threading.Lock()
+
+        instrument_templates()
+
+    def process_request(self, request):
+        for connection in connections.all():
+            instrument_connection(connection)
+
+        request.profiler = None
+        if self.REQUEST_PROFILE_RATE and random.random() < self.REQUEST_PROFILE_RATE:
+            request.profiler = cProfile.Profile()
+            request.profiler.enable()
+
+        _local.timer = request.timer = RequestTimer()
+
+    def process_response(self, request, response):
+        timer = getattr(request, 'timer', None)
+        if timer is None:
+            return response
+
+        timer.stop()
+        _local.timer = None
+
+        profiler = getattr(request, 'profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self.keep_profile(request, profiler, timer.wall_time)
+
+        if self.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = timer.server_timing()
+
+        self.logger.info('%s %s %s %.0fms', request.method, request.path_info,
+            response.status_code, timer.wall_time * 1000,
+            extra={
+                'request': request,
+                'status_code': response.status_code,
+                'timing': timer.as_dict(),
+            }
+        )
+        return response
+
+    def keep_profile(self, request, profiler, wall_time):
+        """Save the profile if it's one of the slowest seen so far."""
+        if self.REQUEST_PROFILE_KEEP <= 0:
+            return
+        with self.profiles_lock:
+            if (len(self.profiles) >= self.REQUEST_PROFILE_KEEP
+                    and wall_time <= self.profiles[0][0]):
+                return
+
+            if not os.path.isdir(self.REQUEST_PROFILE_DIR):
+                os.makedirs(self.REQUEST_PROFILE_DIR)
+            filename = os.path.join(self.REQUEST_PROFILE_DIR, '%08.0fms-%s.prof' % (
+                wall_time * 1000, getattr(request, 'id', None) or id(request)))
+            profiler.dump_stats(filename)
+
+            heapq.heappush(self.profiles, (wall_time, filename))
+            if len(self.profiles) > self.REQUEST_PROFILE_KEEP:
+                wall_time, filename = heapq.heappop(self.profiles)
+                if os.path.exists(filename):
+                    os.remove(filename)
@@ -0,0 +1,102 @@
+import re
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from ..db.routers import use_replica, pick_replica, did_write
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class SelectiveTransactionMiddleware(object):
+    """
+    A replacement for django.middleware.transaction.TransactionMiddleware
+    that only wraps the requests that need it in a transaction.
+
+    A request gets a transaction when:
+
+    * its method isn't one of GET, HEAD, OPTIONS or TRACE, unless the view
+      is decorated with `{{ project_name }}.utils.transaction.not_transactional`,
+    * the view is decorated with `{{ project_name }}.utils.transaction.transactional`, or
+    * its path matches one of the regular expressions in TRANSACTIONAL_URLS.
+
+    Other requests run in autocommit mode, and their reads go to one of the
+    REPLICA_DATABASES when any are configured and ReplicaRouter is in
+    DATABASE_ROUTERS.
+
+    When a request writes to the database the response sets a cookie named
+    REPLICA_PIN_COOKIE, which sends the reads of the requests from the same
+    browser to the primary for the next REPLICA_PIN_SECONDS, so they see
+    the write even when the replicas are behind.
+
+    The transaction is committed when the view returns a response and
+    rolled back when it raises an exception, like TransactionMiddleware.
+    """
+    def __init__(self, TRANSACTIONAL_URLS=(), REPLICA_PIN_SECONDS=5,
+            REPLICA_PIN_COOKIE='pin_primary'):
+        self.TRANSACTIONAL_URLS = [re.compile(pattern) for pattern in
+            getattr(settings, 'TRANSACTIONAL_URLS', TRANSACTIONAL_URLS)]
+        self.REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', REPLICA_PIN_SECONDS)
+        self.REPLICA_PIN_COOKIE = getattr(settings, 'REPLICA_PIN_COOKIE', REPLICA_PIN_COOKIE)
+
+    def is_pinned(self, request):
+        """Returns True if the browser wrote to the database recently."""
+        try:
+            return float(request.COOKIES[self.REPLICA_PIN_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+    def pin(self, request, response):
+        """Send the reads of the browser to the primary for a while."""
+        if self.REPLICA_PIN_SECONDS and did_write():
+            response.set_cookie(self.REPLICA_PIN_COOKIE,
+                '%.3f' % (time.time() + self.REPLICA_PIN_SECONDS),
+                max_age=self.REPLICA_PIN_SECONDS, httponly=True)
+
+    def is_transactional(self, request, view_func):
+        marked = getattr(view_func, 'transactional', None)
+        if marked is not None:
+            return marked
+        if request.method not in SAFE_METHODS:
+            return True
+        return any(pattern.search(request.path_info) for pattern in self.TRANSACTIONAL_URLS)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.transactional = self.is_transactional(request, view_func)
+        if request.transactional:
+            transaction.enter_transaction_management()
+            transaction.managed(True)
+            use_replica(None)
+        elif request.method in SAFE_METHODS and not self.is_pinned(request):
+            use_replica(pick_replica())
+        else:
+            use_replica(None)
+
+    def process_exception(self, request, exception):
+        """Rolls back the transaction."""
+        if getattr(request, 'transactional', False) and transaction.is_managed():
+            if transaction.is_dirty():
+                transaction.rollback()
+            transaction.leave_transaction_management()
+            request.transactional = False
+        use_replica(None)
+
+    def process_response(self, request, response):
+        """Commits and leaves transaction management."""
+        if getattr(request, 'transactional', False) and transaction.is_managed():
+            if transaction.is_dirty():
+                try:
+                    transaction.commit()
+                except Exception:
+                    # Deferred constraint checks can make the commit fail,
+                    # the connection is still usable after a rollback.
+                    transaction.rollback()
+                    transaction.leave_transaction_management()
+                    raise
+            transaction.leave_transaction_management()
+            request.transactional = False
+        self.pin(request, response)
+        use_replica(None)
+        return response
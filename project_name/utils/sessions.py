@@ -0,0 +1,101 @@
+from __future__ import absolute_import
+
+import cPickle as pickle
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import cache as default_cache, get_cache, DEFAULT_CACHE_ALIAS
+
+KEY_PREFIX = 'django.contrib.sessions.cached_db'
+
+
+def get_session_cache():
+    """Returns the cache named by the SESSION_CACHE_ALIAS setting."""
+    alias = getattr(settings, 'SESSION_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)
+    if alias == DEFAULT_CACHE_ALIAS:
+        return default_cache
+    return get_cache(alias)
+
+
+cache = get_session_cache()
+
+
+def dumps(data):
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+
+class SessionStore(DBStore):
+    """
+    A write-through cached session engine, like
+    django.contrib.sessions.backends.cached_db, with two differences:
+
+    The cache is the one named by SESSION_CACHE_ALIAS instead of always
+    being the default cache.
+
+    Sessions that are saved with the same data they were loaded with aren't
+    written again. Django saves a session whenever a value is assigned to
+    it, even when it's the value that was already there. Unless
+    SESSION_SAVE_EVERY_REQUEST is on, in which case every save is written
+    to keep the expiry date moving.
+    """
+    def __init__(self, session_key=None):
+        super(SessionStore, self).__init__(session_key)
+        # The session key and pickled data of the session as it was loaded.
+        self._loaded = None
+
+    @property
+    def cache_key(self):
+        return KEY_PREFIX + self._get_or_create_session_key()
+
+    def load(self):
+        try:
+            data = cache.get(self.cache_key, None)
+        except Exception:
+            # Some backends (e.g. memcache) raise an exception on invalid
+            # cache keys. If this happens, reset the session.
+            data = None
+        if data is None:
+            data = super(SessionStore, self).load()
+            cache.set(self.cache_key, data, settings.SESSION_COOKIE_AGE)
+        self._loaded = self.session_key, dumps(data)
+        return data
+
+    def unchanged(self):
+        """Returns True if the session holds the same data it was loaded with."""
+        if self._loaded is None or settings.SESSION_SAVE_EVERY_REQUEST:
+            return False
+        session_key, data = self._loaded
+        # Compare against an unpickled copy, so changes made in place to
+        # values in the session are noticed too.
+        return (session_key == self.session_key
+            and pickle.loads(data) == self._get_session(no_load=True))
+
+    def exists(self, session_key):
+        if (KEY_PREFIX + session_key) in cache:
+            return True
+        return super(SessionStore, self).exists(session_key)
+
+    def save(self, must_create=False):
+        if not must_create and self.unchanged():
+            return
+        super(SessionStore, self).save(must_create)
+        cache.set(self.cache_key, self._session, settings.SESSION_COOKIE_AGE)
+        self._loaded = self.session_key, dumps(self._session)
+
+    def delete(self, session_key=None):
+        super(SessionStore, self).delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        cache.delete(KEY_PREFIX + session_key)
+        self._loaded = None
+
+    def flush(self):
+        """
+        Removes the current session data from the database and regenerates the
+        key.
+        """
+        self.clear()
+        self.delete(self.session_key)
+        self.create()
@@ -0,0 +1,227 @@
+"""
+Static files storages that write pre-compressed copies of each file, so the
+web server can send them without compressing on the fly, and copies named
+after the hash of their contents, so it can tell browsers to cache them
+forever.
+"""
+from __future__ import absolute_import
+
+import os
+import gzip
+import json
+import hashlib
+import multiprocessing
+from cStringIO import StringIO
+
+from django.contrib.staticfiles.storage import StaticFilesStorage, CachedFilesMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zopfli.gzip
+except ImportError:
+    zopfli = None
+
+
+# The files worth compressing, images and fonts like WOFF are compressed already.
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.html', '.txt', '.xml', '.json', '.svg',
+    '.ico', '.eot', '.ttf', '.otf', '.map')
+
+# Files smaller than this many bytes fit in a packet anyway.
+PRECOMPRESS_MIN_SIZE = 256
+
+
+def gzip_compress(data):
+    """
+    Compresses `data` to the gzip format with zopfli when it's installed,
+    which is slow but about 5% smaller, otherwise with gzip's best level.
+    """
+    if zopfli is not None:
+        return zopfli.gzip.compress(data)
+    out = StringIO()
+    # No mtime, so unchanged files compress to the same bytes.
+    with gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=out, mtime=0) as f:
+        f.write(data)
+    return out.getvalue()
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+def variants():
+    """Returns (suffix, compress function) for each format that can be written."""
+    formats = [('.gz', gzip_compress)]
+    if brotli is not None:
+        formats.append(('.br', brotli_compress))
+    return formats
+
+
+def has_variants(path):
+    """Returns True if every compressed variant of the file at `path` exists."""
+    return all(os.path.exists(path + suffix) for suffix, compress in variants())
+
+
+def write_atomic(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.rename(path + '.tmp', path)
+
+
+def precompress(path, previous_hash=None):
+    """
+    Writes the compressed variants of the file at `path` next to it, unless
+    its contents hash to `previous_hash`, the hash they had when they were
+    last compressed, and all the variants are still there. Variants that
+    wouldn't be smaller than the file are removed instead.
+
+    Returns the hash of the file and whether it was compressed.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.md5(data).hexdigest()
+    if digest == previous_hash and has_variants(path):
+        return digest, False
+
+    for suffix, compress in variants():
+        compressed = compress(data) if len(data) >= PRECOMPRESS_MIN_SIZE else None
+        if compressed is not None and len(compressed) < len(data):
+            write_atomic(path + suffix, compressed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return digest, True
+
+
+def _precompress(args):
+    path, previous_hash = args
+    return precompress(path, previous_hash)
+
+
+def should_precompress(name):
+    return os.path.splitext(name)[1].lower() in PRECOMPRESS_EXTENSIONS
+
+
+class PrecompressedMixin(object):
+    """
+    Writes gzip (.gz, with zopfli when it's installed) and brotli (.br, when
+    it's installed) copies next to the files collectstatic copies, for
+    nginx's gzip_static and brotli_static.
+
+    The files are compressed in a pool of processes. The hash of each file
+    is kept in precompressed.json, so files that haven't changed since the
+    last collectstatic aren't compressed again. Delete it to compress
+    everything again.
+    """
+    precompress_manifest = 'precompressed.json'
+
+    def load_precompressed(self):
+        try:
+            with open(self.path(self.precompress_manifest)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def save_precompressed(self, hashes):
+        write_atomic(self.path(self.precompress_manifest), json.dumps(hashes))
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set(paths)
+        parent = getattr(super(PrecompressedMixin, self), 'post_process', None)
+        if parent is not None:
+            for name, processed_name, processed in parent(paths, dry_run, **options):
+                if processed_name:
+                    names.add(processed_name)
+                yield name, processed_name, processed
+        if dry_run:
+            return
+
+        previous = self.load_precompressed()
+        names = sorted(name for name in names if should_precompress(name))
+        if not names:
+            return
+        jobs = [(self.path(name), previous.get(name)) for name in names]
+        pool = multiprocessing.Pool()
+        try:
+            results = pool.map(_precompress, jobs)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        self.save_precompressed(dict((name, digest)
+            for name, (digest, compressed) in zip(names, results)))
+
+
+class HashedNames(dict):
+    """
+    The hashed name of each static file, looked up in memory. Stands in for
+    the cache CachedFilesMixin keeps the names in.
+    """
+    def set(self, key, value, timeout=None):
+        self[key] = value
+
+    def set_many(self, mapping, timeout=None):
+        self.update(mapping)
+
+
+class ManifestFilesMixin(CachedFilesMixin):
+    """
+    Saves a copy of each static file named after the hash of its contents,
+    like main.ae413c0e54a1.css, with the url() and @import references in
+    CSS files changed to the hashed names, like CachedFilesMixin.
+
+    Instead of a cache, the hashed names are kept in staticfiles.json in
+    STATIC_ROOT, written by collectstatic and read once by each process, so
+    url() is a dict lookup and every server agrees on the names.
+    """
+    manifest_name = 'staticfiles.json'
+
+    def __init__(self, *args, **kwargs):
+        super(ManifestFilesMixin, self).__init__(*args, **kwargs)
+        self.cache = HashedNames(self.load_manifest())
+
+    def cache_key(self, name):
+        return name.replace('\\', '/')
+
+    def load_manifest(self):
+        if not self.location:
+            return {}
+        try:
+            with open(self.path(self.manifest_name)) as f:
+                return json.load(f)['paths']
+        except (IOError, ValueError, KeyError):
+            return {}
+
+    def save_manifest(self, paths):
+        write_atomic(self.path(self.manifest_name),
+            json.dumps({'paths': paths}, indent=2, sort_keys=True))
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = {}
+        parent = super(ManifestFilesMixin, self).post_process
+        for name, hashed_name, processed in parent(paths, dry_run, **options):
+            hashed[self.cache_key(name)] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # Forget the files that aren't collected anymore.
+        self.cache = HashedNames(hashed)
+        self.save_manifest(hashed)
+
+
+class PrecompressedStaticFilesStorage(PrecompressedMixin, StaticFilesStorage):
+    pass
+
+
+class ManifestStaticFilesStorage(ManifestFilesMixin, StaticFilesStorage):
+    pass
+
+
+class HashedStaticFilesStorage(PrecompressedMixin, ManifestFilesMixin, StaticFilesStorage):
+    """
+    Saves hashed copies of the static files, see ManifestFilesMixin, then
+    pre-compresses both the files and their hashed copies.
+    """
+    pass
@@ -0,0 +1,116 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import get_cache
+from django.utils import translation
+from django.utils.encoding import smart_str
+
+
+register = template.Library()
+
+_caches = {}
+
+
+def get_fragment_cache():
+    """
+    Returns the cache named by FRAGMENT_CACHE_ALIAS, created once per process
+    so a TieredCache keeps its local entries between requests.
+    """
+    alias = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')
+    if alias not in _caches:
+        _caches[alias] = get_cache(alias)
+    return _caches[alias]
+
+
+def is_authenticated(context):
+    """
+    Returns True if the template is rendered for a logged in user.
+
+    Requests without a session cookie are anonymous, looking at `request.user`
+    for those would load the session and make the response vary on Cookie.
+    """
+    request = context.get('request')
+    if request is not None and settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return False
+    user = getattr(request, 'user', None) or context.get('user')
+    return user is not None and user.is_authenticated()
+
+
+def make_key(name, language, authenticated, vary_on=()):
+    """
+    Returns the cache key of the fragment `name`. Fragments are cached
+    separately for each language, for anonymous and logged in visitors, for
+    each DEPLOY_VERSION and for each combination of the `vary_on` values.
+    """
+    vary = hashlib.md5(':'.join(smart_str(value) for value in vary_on)).hexdigest()
+    return 'fragment:%s:%s:%s:%s:%s' % (getattr(settings, 'DEPLOY_VERSION', ''),
+        name, language, 'auth' if authenticated else 'anon', vary)
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, timeout, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.timeout = timeout
+        self.vary_on = vary_on
+
+    def render(self, context):
+        if self.timeout is None:
+            timeout = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+        else:
+            timeout = self.timeout.resolve(context)
+        try:
+            timeout = int(timeout)
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                '"cachefragment" timeout must be an integer: got "%s"' % timeout)
+        if not timeout:
+            return self.nodelist.render(context)
+
+        key = make_key(self.name.resolve(context), translation.get_language(),
+            is_authenticated(context), [var.resolve(context) for var in self.vary_on])
+        cache = get_fragment_cache()
+        value = cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, timeout)
+        return value
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    Caches the rendered contents of the block in the FRAGMENT_CACHE_ALIAS
+    cache for FRAGMENT_CACHE_TIMEOUT seconds, or `timeout` seconds when given.
+
+    After loading the fragment_cache library, wrap the block in a
+    cachefragment tag named after the fragment, closed by endcachefragment::
+
+        cachefragment "navbar"
+        cachefragment "sidebar" timeout=60 request.path
+
+    The fragment is cached separately for each language, for anonymous and
+    logged in visitors and for each DEPLOY_VERSION. Pass any other values
+    the contents depend on after the name, like the path for a navbar that
+    highlights the current page or the user's id for contents showing their
+    name. Blocks inside a cached fragment can't be overridden per page.
+
+    The compress tag works inside the block, the cached contents hold the
+    links to the compressed files.
+    """
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            '"%s" tag requires at least 1 argument.' % bits[0])
+
+    timeout = None
+    vary_on = []
+    for bit in bits[2:]:
+        if bit.startswith('timeout='):
+            timeout = parser.compile_filter(bit[len('timeout='):])
+        else:
+            vary_on.append(parser.compile_filter(bit))
+    return FragmentCacheNode(nodelist, parser.compile_filter(bits[1]), timeout, vary_on)
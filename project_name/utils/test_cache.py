@@ -0,0 +1,172 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+from django.test.utils import override_settings
+
+import mock
+
+from .cache import TieredCache
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'remote': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-cache-tests',
+    },
+}
+
+
+class TieredCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.settings = override_settings(CACHES=CACHES)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.cache = self.tiered_cache()
+        self.other = self.tiered_cache()
+        self.cache.remote.clear()
+
+    def tiered_cache(self, **options):
+        options.setdefault('REMOTE', 'remote')
+        options.setdefault('LOCAL_PREFIXES', ('key', 'a', 'b', 'c'))
+        options.setdefault('VERSION_CHECK_INTERVAL', 0)
+        return TieredCache('', {'OPTIONS': options})
+
+    def test_get_and_set(self):
+        """TieredCache should store values in the remote cache."""
+        self.cache.set('key', 'value')
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.remote.get('key'), 'value')
+        self.assertEqual(self.other.get('key'), 'value')
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_gets_from_local_cache(self):
+        """TieredCache should not go to the remote cache for recently used values."""
+        cache = self.tiered_cache(VERSION_CHECK_INTERVAL=60)
+        cache.set('key', 'value')
+        cache.get('key')
+        with mock.patch.object(cache.remote, 'get') as get:
+            self.assertEqual(cache.get('key'), 'value')
+        self.assertFalse(get.called)
+
+    def test_only_keeps_local_prefixes(self):
+        """TieredCache should send the keys outside LOCAL_PREFIXES straight to the remote cache."""
+        self.cache.set('other', 'value')
+
+        self.assertEqual(self.cache._local, {})
+        self.assertEqual(self.cache._versions, {})
+        self.assertEqual(self.other.get('other'), 'value')
+
+    def test_versions_each_prefix(self):
+        """TieredCache should only throw away the local values of the prefix that was written."""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.other.get_many(['a', 'b'])
+        self.cache.set('a', 3)
+
+        self.other.check_version()
+        self.assertEqual([key for key, version in self.other._local], ['b'])
+        self.assertEqual(self.other.get('a'), 3)
+
+    def test_does_not_change_options(self):
+        """TieredCache should not change the OPTIONS of the cache settings."""
+        options = {'REMOTE': 'remote'}
+        TieredCache('', {'OPTIONS': options})
+
+        self.assertEqual(options, {'REMOTE': 'remote'})
+
+    def test_caches_none(self):
+        """TieredCache should keep None values in the local cache."""
+        self.cache.set('key', None)
+
+        self.assertEqual(self.cache.get('key', 'default'), None)
+        self.assertTrue(self.cache.has_key('key'))
+
+    def test_returns_copies(self):
+        """TieredCache should not let callers change the cached values."""
+        self.cache.set('key', {'a': 1})
+        self.cache.get('key')['a'] = 2
+
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+
+    def test_invalidates_other_processes(self):
+        """TieredCache should throw the local cache away when another process writes."""
+        self.cache.set('key', 'old')
+        self.assertEqual(self.other.get('key'), 'old')
+        self.cache.set('key', 'new')
+
+        self.assertEqual(self.other.get('key'), 'new')
+
+    def test_version_check_interval(self):
+        """TieredCache should only check the version key every VERSION_CHECK_INTERVAL seconds."""
+        other = self.tiered_cache(VERSION_CHECK_INTERVAL=60)
+        self.cache.set('key', 'old')
+        self.assertEqual(other.get('key'), 'old')
+        self.cache.set('key', 'new')
+
+        self.assertEqual(other.get('key'), 'old')
+        other._checked = 0
+        self.assertEqual(other.get('key'), 'new')
+
+    def test_local_timeout(self):
+        """TieredCache should only keep values locally for LOCAL_TIMEOUT seconds."""
+        cache = self.tiered_cache(LOCAL_TIMEOUT=10)
+        cache.set('key', 'old')
+        cache.remote.set('key', 'new')
+
+        with mock.patch('time.time', return_value=cache._local.values()[0][0] + 1):
+            self.assertEqual(cache.get('key'), 'new')
+
+    def test_max_entries(self):
+        """TieredCache should drop the least recently used values past MAX_ENTRIES."""
+        cache = self.tiered_cache(MAX_ENTRIES=2)
+        cache.set_many({'a': 1, 'b': 2})
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(sorted(key for key, version in cache._local), ['a', 'c'])
+
+    def test_get_many(self):
+        """TieredCache.get_many should combine local and remote values."""
+        self.cache.set('a', 1)
+        self.cache.remote.set('b', 2)
+
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+    def test_delete(self):
+        """TieredCache.delete should remove the value from both caches."""
+        self.cache.set('key', 'value')
+        self.other.get('key')
+        self.cache.delete('key')
+
+        self.assertEqual(self.cache.get('key'), None)
+        self.assertEqual(self.other.get('key'), None)
+
+    def test_add(self):
+        """TieredCache.add should only set values that aren't in the remote cache."""
+        self.assertTrue(self.cache.add('key', 'value'))
+        self.assertFalse(self.other.add('key', 'other'))
+
+        self.assertEqual(self.other.get('key'), 'value')
+
+    def test_incr(self):
+        """TieredCache.incr should increment the remote value."""
+        self.cache.set('key', 1)
+        self.other.get('key')
+
+        self.assertEqual(self.cache.incr('key'), 2)
+        self.assertEqual(self.other.get('key'), 2)
+        self.assertEqual(self.cache.decr('key', 2), 0)
+        self.assertRaises(ValueError, self.cache.incr, 'missing')
+
+    def test_clear(self):
+        """TieredCache.clear should clear both caches."""
+        self.cache.set('key', 'value')
+        self.other.get('key')
+        self.cache.clear()
+
+        self.assertEqual(self.cache.get('key'), None)
+        self.assertEqual(self.other.get('key'), None)
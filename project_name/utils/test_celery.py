@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+
+from .middleware.request_id import get_request_id, set_request_id
+from .celery import RequestIdMixin
+
+
+class FakeTask(object):
+    """Records how it was queued and which request ID it ran with."""
+    def apply_async(self, args=None, kwargs=None, **options):
+        self.sent = kwargs
+        return self(*(args or ()), **(kwargs or {}))
+
+    def __call__(self, *args, **kwargs):
+        self.ran_with = get_request_id(), kwargs
+
+
+class RequestIdTask(RequestIdMixin, FakeTask):
+    pass
+
+
+class RequestIdPropagationTests(unittest.TestCase):
+    def tearDown(self):
+        set_request_id(None)
+
+    def test_sends_request_id(self):
+        """RequestIdMixin should send the current request id with the task."""
+        set_request_id('requestid')
+        task = RequestIdTask()
+        task.apply_async((1,), {'a': 2})
+
+        self.assertEqual(task.sent, {'a': 2, '_request_id': 'requestid'})
+
+    def test_outside_of_requests(self):
+        """RequestIdMixin should not send a request id outside of requests."""
+        task = RequestIdTask()
+        task.apply_async()
+
+        self.assertEqual(task.sent, None)
+
+    def test_restores_request_id(self):
+        """RequestIdMixin should run the task with the request id it was sent with."""
+        task = RequestIdTask()
+        task(1, a=2, _request_id='requestid')
+
+        self.assertEqual(task.ran_with, ('requestid', {'a': 2}))
+        self.assertEqual(get_request_id(), None)
+
+    def test_eager_tasks_keep_request_id(self):
+        """RequestIdMixin should keep the request id for tasks run without one."""
+        set_request_id('requestid')
+        task = RequestIdTask()
+        task()
+
+        self.assertEqual(task.ran_with, ('requestid', {}))
+        self.assertEqual(get_request_id(), 'requestid')
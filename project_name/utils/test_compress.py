@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import shutil
+import tempfile
+
+import mock
+from django.test.utils import override_settings
+
+try:
+    from compressor.base import SOURCE_FILE, SOURCE_HUNK
+    from . import compress
+except ImportError:
+    compress = None
+
+
+@unittest.skipUnless(compress, 'django_compressor is not installed')
+class SourcesManifestTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        os.makedirs(os.path.join(self.dir, 'CACHE', 'css'))
+        with open(os.path.join(self.dir, 'CACHE', 'css', 'abc.css'), 'w') as f:
+            f.write('body{}')
+
+        settings = override_settings(COMPRESS_ROOT=self.dir, COMPRESS_URL='/static/',
+            COMPRESS_OUTPUT_DIR='CACHE')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.result = '<link rel="stylesheet" href="/static/CACHE/css/abc.css" type="text/css">'
+
+    def test_reuses_unchanged_blocks(self):
+        """SourcesManifest should return the previous result when the sources are the same."""
+        manifest = compress.SourcesManifest()
+        manifest.set('key', 'sources', self.result)
+        manifest.save()
+
+        manifest = compress.SourcesManifest().load()
+        self.assertEqual(manifest.get('key', 'sources'), self.result)
+        self.assertEqual(manifest.get('key', 'changed'), None)
+        self.assertEqual(manifest.get('other', 'sources'), None)
+
+    def test_missing_output(self):
+        """SourcesManifest should not reuse a result whose compressed file is gone."""
+        manifest = compress.SourcesManifest()
+        manifest.set('key', 'sources', self.result)
+        os.remove(os.path.join(self.dir, 'CACHE', 'css', 'abc.css'))
+
+        self.assertEqual(manifest.get('key', 'sources'), None)
+
+    def test_retain(self):
+        """SourcesManifest.retain should forget the blocks that are gone."""
+        manifest = compress.SourcesManifest()
+        manifest.set('key', 'sources', self.result)
+        manifest.set('gone', 'sources', self.result)
+        manifest.retain(['key'])
+
+        self.assertEqual(list(manifest.entries), ['key'])
+
+
+@unittest.skipUnless(compress, 'django_compressor is not installed')
+class SourceHashTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, 'body{}')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def compressor(self, content):
+        compressor = mock.Mock(content=u'<link href="/static/main.css">', type='css')
+        compressor.split_contents.return_value = [
+            (SOURCE_FILE, self.path, 'main.css', None),
+            (SOURCE_HUNK, content, None, None),
+        ]
+        return compressor
+
+    def test_changes_with_files(self):
+        """source_hash should change when a file the block links to changes."""
+        before = compress.source_hash(self.compressor(u'p{}'))
+        with open(self.path, 'w') as f:
+            f.write('body{color:red}')
+
+        self.assertNotEqual(compress.source_hash(self.compressor(u'p{}')), before)
+        self.assertNotEqual(compress.source_hash(self.compressor(u'a{}')),
+            compress.source_hash(self.compressor(u'p{}')))
+
+    def test_changes_with_referenced_files(self):
+        """source_hash should change when a file a CSS url() points to changes."""
+        image = os.path.join(os.path.dirname(self.path), 'source-hash-test.png')
+        with open(image, 'w') as f:
+            f.write('PNG')
+        self.addCleanup(os.remove, image)
+        with open(self.path, 'w') as f:
+            f.write('body{background:url("source-hash-test.png?v=1")}')
+
+        before = compress.source_hash(self.compressor(u'p{}'))
+        with open(image, 'w') as f:
+            f.write('PNG changed')
+
+        self.assertNotEqual(compress.source_hash(self.compressor(u'p{}')), before)
+
+    @override_settings(COMPRESS_URL='/static/', COMPRESS_ROOT='/srv/static')
+    def test_css_references(self):
+        """css_references should resolve relative and COMPRESS_URL urls and skip the others."""
+        css = ('a{background:url(../img/a.png)} b{background:url("/static/img/b.png#x")} '
+            "c{background:url('data:image/png;base64,AAA')} d{background:url(http://x/d.png)}")
+
+        self.assertEqual(compress.css_references(css, '/srv/static/css'),
+            ['/srv/static/img/a.png', '/srv/static/img/b.png'])
+        self.assertEqual(compress.css_references(css), ['/srv/static/img/b.png'])
+
+    def test_missing_file(self):
+        """source_hash should return None when a file can't be read."""
+        compressor = self.compressor(u'p{}')
+        compressor.split_contents.side_effect = IOError
+
+        self.assertEqual(compress.source_hash(compressor), None)
@@ -0,0 +1,91 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+
+import mock
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import get_cache
+from django.template import Template, Context, TemplateSyntaxError
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from django.utils import translation
+
+from .templatetags import fragment_cache
+
+
+def tag(contents):
+    """Returns a template tag, built up so startproject doesn't render it."""
+    return '{' + '%% %s %%' % contents + '}'
+
+
+def variable(name):
+    """Returns a template variable, built up so startproject doesn't render it."""
+    return '{' + '{ %s }' % name + '}'
+
+
+class FragmentCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        patcher = mock.patch.object(fragment_cache, 'get_fragment_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.settings = override_settings(DEPLOY_VERSION='abc123', FRAGMENT_CACHE_TIMEOUT=300)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def render(self, contents, **context):
+        template = Template(tag('load fragment_cache') + tag(contents) +
+            variable('value') + tag('endcachefragment'))
+        return template.render(Context(context))
+
+    def test_caches_fragment(self):
+        """cachefragment should render the block once and then use the cached copy."""
+        self.assertEqual(self.render('cachefragment "nav"', value=1), '1')
+        self.assertEqual(self.render('cachefragment "nav"', value=2), '1')
+        self.assertEqual(self.render('cachefragment "footer"', value=3), '3')
+
+    def test_varies_on_language_and_authentication(self):
+        """cachefragment should cache fragments for each language and authenticated state."""
+        user = User(username='user')
+        self.render('cachefragment "nav"', value=1, user=AnonymousUser())
+
+        self.assertEqual(self.render('cachefragment "nav"', value=2, user=user), '2')
+        with translation.override('de'):
+            self.assertEqual(self.render('cachefragment "nav"', value=3, user=user), '3')
+        self.assertEqual(self.render('cachefragment "nav"', value=4, user=AnonymousUser()), '1')
+
+    def test_anonymous_without_session_cookie(self):
+        """cachefragment should not look at the user of requests without a session cookie."""
+        request = RequestFactory().get('/')
+        request.user = mock.Mock()
+
+        self.assertEqual(self.render('cachefragment "nav"', value=1, request=request), '1')
+        self.assertFalse(request.user.is_authenticated.called)
+
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'sessionkey'
+        request.user.is_authenticated.return_value = True
+        self.assertEqual(self.render('cachefragment "nav"', value=2, request=request), '2')
+
+    def test_varies_on_deploy_version(self):
+        """cachefragment should not use the fragments cached by the previous release."""
+        self.render('cachefragment "nav"', value=1)
+
+        with override_settings(DEPLOY_VERSION='def456'):
+            self.assertEqual(self.render('cachefragment "nav"', value=2), '2')
+
+    def test_vary_on(self):
+        """cachefragment should cache fragments for each combination of the extra values."""
+        self.render('cachefragment "nav" path', value=1, path='/')
+
+        self.assertEqual(self.render('cachefragment "nav" path', value=2, path='/about/'), '2')
+        self.assertEqual(self.render('cachefragment "nav" path', value=3, path='/'), '1')
+
+    def test_timeout(self):
+        """cachefragment should not cache fragments with a timeout of 0."""
+        self.render('cachefragment "nav" timeout=0', value=1)
+
+        self.assertEqual(self.render('cachefragment "nav" timeout=0', value=2), '2')
+        self.assertRaises(TemplateSyntaxError, self.render, 'cachefragment "nav" timeout=soon', value=1)
+
@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import sys
+import shutil
+import tempfile
+from StringIO import StringIO
+
+import mock
+from django.core.management import call_command
+
+from . import importtime
+
+
+def node(name, cumulative, self, children=()):
+    return {'name': name, 'cumulative': cumulative, 'self': self, 'children': list(children)}
+
+
+class ImportTimerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.dir, 'timedpkg'))
+        for name, content in (('__init__.py', 'from timedpkg import a\n'),
+                              ('a.py', 'from timedpkg import b\n'),
+                              ('b.py', 'import os\n')):
+            with open(os.path.join(self.dir, 'timedpkg', name), 'w') as f:
+                f.write(content)
+        sys.path.insert(0, self.dir)
+
+    def tearDown(self):
+        sys.path.remove(self.dir)
+        for name in ('timedpkg', 'timedpkg.a', 'timedpkg.b'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.dir)
+
+    def test_tree(self):
+        """ImportTimer should record the modules each import pulled in."""
+        timer = importtime.ImportTimer()
+        timer.install()
+        try:
+            import timedpkg
+        finally:
+            timer.uninstall()
+
+        names = [(depth, item['name']) for depth, item in importtime.iter_nodes(timer.root)]
+        self.assertEqual(names, [(0, 'timedpkg'), (1, 'timedpkg.a'), (2, 'timedpkg.b')])
+        package = timer.root['children'][0]
+        self.assertTrue(0 <= package['self'] <= package['cumulative'])
+        self.assertEqual(timer.root['cumulative'], package['cumulative'])
+
+    def test_missing_module(self):
+        """ImportTimer should let missing modules raise ImportError as usual."""
+        timer = importtime.ImportTimer()
+        timer.install()
+        try:
+            self.assertRaises(ImportError, __import__, 'timedpkg.missing')
+        finally:
+            timer.uninstall()
+
+
+class AppTimesTests(unittest.TestCase):
+    def test_app_times(self):
+        """app_times should charge each module to the app with the longest matching name."""
+        root = node(None, 0.6, 0, [
+            node('django.contrib.admin', 0.5, 0.1, [
+                node('django.contrib.admindocs', 0.1, 0.1),
+                node('django.contrib.admin.sites', 0.3, 0.3),
+            ]),
+            node('south', 0.1, 0.1),
+        ])
+
+        self.assertEqual(importtime.app_times(root, ['django.contrib.admin', 'django.contrib.admindocs']),
+            [('django.contrib.admin', 0.4, 2), ('django.contrib.admindocs', 0.1, 1)])
+
+
+class CommandTests(unittest.TestCase):
+    report = {
+        'entry': 'wsgi',
+        'settings': 'project.settings.production',
+        'debug': False,
+        'installed_apps': ['south', 'django_nose'],
+        'dev_only_apps': ['django_nose', 'debug_toolbar'],
+        'elapsed': 0.5,
+        'tree': node(None, 0.3, 0, [
+            node('south', 0.2, 0.1, [node('south.db', 0.1, 0.1)]),
+            node('django_nose', 0.1, 0.1),
+        ]),
+    }
+
+    def call(self, **options):
+        stdout = StringIO()
+        with mock.patch('%s.management.commands.profile_imports.Command.profile' % __package__,
+                return_value=self.report):
+            call_command('profile_imports', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_report(self):
+        """profile_imports should report the apps, the import tree and the dev-only apps."""
+        output = self.call()
+
+        self.assertIn('imported 3 modules in 500.0ms', output)
+        self.assertIn('200.0ms (  100.0ms)  south\n', output)
+        self.assertIn('100.0ms (  100.0ms)    south.db\n', output)
+        self.assertIn('Development apps imported with DEBUG = False:\n      100.0ms  django_nose', output)
+
+    def test_depth(self):
+        """profile_imports should leave out the levels of the tree below --depth."""
+        self.assertNotIn('south.db', self.call(depth=1))
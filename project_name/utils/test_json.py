@@ -1,21 +1,38 @@
+from __future__ import absolute_import
+
 from django.utils import unittest
+import json as stdlib_json
 import decimal
 import uuid
 import datetime
 import Cookie
 
+import mock
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 from django.http import HttpResponse
 
+from . import json
 from .json import ExtendedJSONEncoder
 
 
 class ExtendedJSONEncoderTests(unittest.TestCase):
+    backend = 'json'
+
     def assertExtendedJSONEncoderReturns(self, input, expected):
-        """A shorthand assertion for ExtendedJSONEncoder.default() equality."""
+        """
+        A shorthand assertion for ExtendedJSONEncoder.default() equality.
+
+        It also checks that the JSON backend encodes the input the same way
+        the json module does.
+        """
         output = ExtendedJSONEncoder().default(input)
         self.assertEqual(output, expected)
 
+        encode = json.get_backend(self.backend).encode_function(ExtendedJSONEncoder())
+        self.assertEqual(stdlib_json.loads(encode(input)),
+            stdlib_json.loads(stdlib_json.dumps(expected, cls=ExtendedJSONEncoder)))
+
     def test_supports_datetime_objects(self):
         """ExtendedJSONEncoder should return a JSON representation of a datetime.datetime."""
         dt = datetime.datetime(2012, 11, 26, 17, 28, 40, 56808)
@@ -46,6 +63,7 @@ class ExtendedJSONEncoderTests(unittest.TestCase):
         c = Cookie.SimpleCookie()
         self.assertExtendedJSONEncoderReturns(c, {})
 
+    @override_settings(LOG_REQUEST_HEADERS=None)
     def test_supports_httprequest_objects(self):
         """ExtendedJSONEncoder should return a JSON representation of a django.http.HttpRequest."""
         r = RequestFactory().get('/')
@@ -53,9 +71,125 @@ class ExtendedJSONEncoderTests(unittest.TestCase):
             'session': None, 'META': {'HTTP_COOKIE': ''}, 'user': None,
             'id': None, 'path_info': u'/'})
 
+    @override_settings(LOG_REQUEST_HEADERS=None)
+    def test_httprequest_summary_is_cached(self):
+        """ExtendedJSONEncoder should only collect the headers of a django.http.HttpRequest once."""
+        r = RequestFactory().get('/')
+        ExtendedJSONEncoder().default(r)
+        r.META['HTTP_USER_AGENT'] = 'changed'
+
+        output = ExtendedJSONEncoder().default(r)
+        self.assertEqual(output['META'], {'HTTP_COOKIE': ''})
+
+    def test_httprequest_summary_tracks_id(self):
+        """ExtendedJSONEncoder should include the id a django.http.HttpRequest gets after it was first encoded."""
+        r = RequestFactory().get('/')
+        ExtendedJSONEncoder().default(r)
+        r.id = 'abc'
+
+        output = ExtendedJSONEncoder().default(r)
+        self.assertEqual(output['id'], 'abc')
+
+    def test_httprequest_summary_tracks_user(self):
+        """ExtendedJSONEncoder should include the current user of a django.http.HttpRequest."""
+        r = RequestFactory().get('/')
+        ExtendedJSONEncoder().default(r)
+        r.user = mock.Mock(id=10)
+
+        output = ExtendedJSONEncoder().default(r)
+        self.assertEqual(output['user'], 10)
+
+    @override_settings(LOG_REQUEST_HEADERS=('HTTP_USER_AGENT', 'HTTP_REFERER'))
+    def test_httprequest_headers_allow_list(self):
+        """ExtendedJSONEncoder should only include the headers in LOG_REQUEST_HEADERS."""
+        r = RequestFactory().get('/', HTTP_USER_AGENT='test')
+
+        output = ExtendedJSONEncoder().default(r)
+        self.assertEqual(output['META'], {'HTTP_USER_AGENT': 'test'})
+
     def test_supports_httpresponse_objects(self):
         """ExtendedJSONEncoder should return a JSON representation of a django.http.HttpResponse."""
         r = HttpResponse()
         self.assertExtendedJSONEncoderReturns(r,
             {'status_code': 200, 'cookies': Cookie.SimpleCookie(),
              'headers': {'content-type': ('Content-Type', 'text/html; charset=utf-8')}})
+
+    def test_unsupported_objects_raise_type_error(self):
+        """ExtendedJSONEncoder should raise a TypeError for objects it doesn't understand."""
+        self.assertRaises(TypeError, ExtendedJSONEncoder().default, object())
+
+    def test_supports_subclasses(self):
+        """ExtendedJSONEncoder should use the encoder of the closest registered base class."""
+        class MyDate(datetime.date):
+            pass
+
+        self.assertExtendedJSONEncoderReturns(MyDate(2012, 11, 26), '2012-11-26')
+
+
+@unittest.skipUnless(json.simplejson, 'simplejson is not installed')
+class SimpleJSONExtendedJSONEncoderTests(ExtendedJSONEncoderTests):
+    backend = 'simplejson'
+
+
+class RegisterTests(unittest.TestCase):
+    class Point(object):
+        def __init__(self, x, y):
+            self.x = x
+            self.y = y
+
+    def tearDown(self):
+        if self.Point in json._encoders:
+            json.unregister(self.Point)
+
+    def test_register_adds_support_for_new_types(self):
+        """register() should make ExtendedJSONEncoder understand a new type."""
+        json.register(self.Point, lambda p: [p.x, p.y])
+
+        output = ExtendedJSONEncoder().default(self.Point(1, 2))
+        self.assertEqual(output, [1, 2])
+
+    def test_register_overrides_cached_lookups(self):
+        """register() should take effect for types that were already looked up."""
+        self.assertEqual(json.get_encoder(self.Point), None)
+
+        json.register(self.Point, lambda p: [p.x, p.y])
+        self.assertNotEqual(json.get_encoder(self.Point), None)
+
+    def test_unregister_removes_support(self):
+        """unregister() should remove the encoder for a type."""
+        json.register(self.Point, lambda p: [p.x, p.y])
+        json.unregister(self.Point)
+
+        self.assertRaises(TypeError, ExtendedJSONEncoder().default, self.Point(1, 2))
+
+
+class BackendTests(unittest.TestCase):
+    def test_get_backend_defaults_to_an_available_backend(self):
+        """get_backend() should return an installed backend when no name is given."""
+        self.assertTrue(json.get_backend().available)
+
+    def test_get_backend_by_name(self):
+        """get_backend() should return the backend with the given name."""
+        self.assertEqual(json.get_backend('json').name, 'json')
+
+    def test_get_backend_unknown(self):
+        """get_backend() should raise a ValueError for unknown backends."""
+        self.assertRaises(ValueError, json.get_backend, 'nope')
+
+    def test_get_backend_not_installed(self):
+        """get_backend() should raise an ImportError for backends that aren't installed."""
+        with mock.patch.object(json.Backend, 'module', None):
+            self.assertRaises(ImportError, json.get_backend, 'json')
+
+    def test_dumps(self):
+        """dumps() should return JSON using ExtendedJSONEncoder."""
+        output = json.dumps({'total': decimal.Decimal('1.51')})
+        self.assertEqual(stdlib_json.loads(output), {'total': '1.51'})
+
+    def test_backends_use_encoder_options(self):
+        """Every installed backend should encode with the options of the encoder."""
+        encoder = ExtendedJSONEncoder(sort_keys=True, separators=(',', ':'))
+        for backend in json.backends:
+            if backend.available:
+                encode = backend.encode_function(encoder)
+                self.assertEqual(encode({'b': 1, 'a': 2}), '{"a":2,"b":1}')
@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+import mock
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from .management.commands import precompile_templates
+
+
+def tag(contents):
+    """Returns a template tag, built up so startproject doesn't render it."""
+    return '{' + '%% %s %%' % contents + '}'
+
+
+class PrecompileTemplatesTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        os.mkdir(os.path.join(self.dir, 'app'))
+        self.app_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.app_dir)
+        self.write(self.dir, 'base.html', tag('block content') + tag('endblock'))
+        self.write(self.app_dir, 'email.txt', tag('if user') + tag('endif'))
+
+        settings = override_settings(TEMPLATE_DIRS=(self.dir,))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(precompile_templates, 'app_template_dirs', (self.app_dir,))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, template_dir, name, contents):
+        with open(os.path.join(template_dir, name), 'w') as f:
+            f.write(contents)
+
+    def call(self, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('precompile_templates', stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_compiles_templates(self):
+        """precompile_templates should compile the templates in TEMPLATE_DIRS and the apps."""
+        stdout, stderr = self.call(verbosity=2)
+
+        self.assertIn('base.html', stdout)
+        self.assertIn('email.txt', stdout)
+        self.assertIn('Compiled 2 templates.', stdout)
+
+    def test_fails_on_syntax_errors(self):
+        """precompile_templates should fail when a template has a syntax error."""
+        self.write(self.dir, 'app/broken.html', tag('if') + tag('endif'))
+
+        stderr = StringIO()
+        with self.assertRaises(SystemExit):
+            call_command('precompile_templates', stdout=StringIO(), stderr=stderr)
+
+        self.assertIn('broken.html', stderr.getvalue())
+        self.assertIn('1 of 3 templates failed to compile.', stderr.getvalue())
+
+    def test_ignore(self):
+        """precompile_templates should skip the templates matching --ignore."""
+        self.write(self.dir, 'app/broken.html', tag('if') + tag('endif'))
+
+        stdout, stderr = self.call(ignore=['app/broken.*'], extensions=['html'])
+
+        self.assertIn('Compiled 1 templates.', stdout)
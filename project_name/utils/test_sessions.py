@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import datetime
+from StringIO import StringIO
+
+import mock
+from django.contrib.sessions.models import Session
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import sessions
+from .sessions import SessionStore
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        # Test the store itself, not whatever cache is configured.
+        patcher = mock.patch.object(sessions, 'cache',
+            LocMemCache('session-store-tests', {}))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache.clear()
+
+    def session(self):
+        """Returns a saved session with a value in it, freshly loaded."""
+        session = SessionStore()
+        session['key'] = 'value'
+        session.save()
+        return SessionStore(session.session_key)
+
+    def test_loads_from_cache(self):
+        """SessionStore should load sessions from the cache."""
+        session = self.session()
+        with self.assertNumQueries(0):
+            self.assertEqual(session['key'], 'value')
+
+    def test_writes_through(self):
+        """SessionStore should save sessions to the database and the cache."""
+        session = self.session()
+        session['key'] = 'changed'
+        session.save()
+        self.cache.clear()
+
+        self.assertEqual(SessionStore(session.session_key)['key'], 'changed')
+
+    def test_skips_unchanged_saves(self):
+        """SessionStore should not write sessions that haven't changed."""
+        session = self.session()
+        session['key'] = 'value'
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_save_every_request(self):
+        """SessionStore should write every save with SESSION_SAVE_EVERY_REQUEST."""
+        session = self.session()
+        session['key'] = 'value'
+        with override_settings(SESSION_SAVE_EVERY_REQUEST=True):
+            with self.assertNumQueries(2):
+                session.save()
+
+    def test_cycle_key(self):
+        """SessionStore should keep the data when the session key changes."""
+        session = self.session()
+        session['key']
+        old_key = session.session_key
+        session.cycle_key()
+        session.save()
+
+        self.assertNotEqual(session.session_key, old_key)
+        self.cache.clear()
+        self.assertEqual(SessionStore(session.session_key)['key'], 'value')
+
+    def test_delete(self):
+        """SessionStore.delete should remove the session from the database and the cache."""
+        session = self.session()
+        session['key']
+        session.delete()
+
+        self.assertFalse(session.exists(session.session_key))
+
+
+class PurgeSessionsTests(TestCase):
+    def create(self, key, days):
+        Session.objects.create(session_key=key, session_data='',
+            expire_date=timezone.now() + datetime.timedelta(days=days))
+
+    def test_purges_expired_sessions(self):
+        """purge_sessions should delete the expired sessions in batches."""
+        for i in range(5):
+            self.create('expired%d' % i, -1)
+        self.create('current', 1)
+        stdout = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=stdout)
+
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current'])
+        self.assertEqual(stdout.getvalue(), 'Deleted 5 expired sessions in total\n')
@@ -0,0 +1,147 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import gzip
+import json
+import shutil
+import tempfile
+
+import mock
+from django.core.files.storage import FileSystemStorage
+from django.test.utils import override_settings
+
+from . import storage
+
+
+class StorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = self.write('main.css', 'body { color: red; }\n' * 100)
+
+    def write(self, name, contents):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+
+class PrecompressTests(StorageTestCase):
+    def test_writes_variants(self):
+        """precompress should write a gzip copy that decompresses to the file."""
+        digest, compressed = storage.precompress(self.path)
+
+        self.assertTrue(compressed)
+        self.assertEqual(gzip.open(self.path + '.gz').read(), 'body { color: red; }\n' * 100)
+        self.assertEqual(os.path.exists(self.path + '.br'), storage.brotli is not None)
+
+    def test_skips_unchanged_files(self):
+        """precompress should not compress a file again when its hash hasn't changed."""
+        digest, compressed = storage.precompress(self.path)
+
+        with mock.patch.object(storage, 'gzip_compress') as gzip_compress:
+            self.assertEqual(storage.precompress(self.path, digest), (digest, False))
+        self.assertFalse(gzip_compress.called)
+
+    def test_replaces_missing_variants(self):
+        """precompress should compress an unchanged file again when one of its variants is missing."""
+        digest, compressed = storage.precompress(self.path)
+        os.remove(self.path + '.gz')
+
+        self.assertEqual(storage.precompress(self.path, digest), (digest, True))
+        self.assertTrue(os.path.exists(self.path + '.gz'))
+
+    def test_skips_small_files(self):
+        """precompress should not write copies of tiny files and remove stale ones."""
+        storage.precompress(self.path)
+        self.write('main.css', 'body{}')
+
+        storage.precompress(self.path)
+
+        self.assertFalse(os.path.exists(self.path + '.gz'))
+
+    def test_gzip_is_deterministic(self):
+        """gzip_compress should compress the same data to the same bytes."""
+        self.assertEqual(storage.gzip_compress('data' * 100), storage.gzip_compress('data' * 100))
+
+
+class PrecompressedStaticFilesStorageTests(StorageTestCase):
+    def test_post_process(self):
+        """post_process should precompress the collected text files and remember their hashes."""
+        self.write('logo.png', 'PNG' * 200)
+        files = storage.PrecompressedStaticFilesStorage(location=self.dir, base_url='/static/')
+
+        self.assertEqual(list(files.post_process({'main.css': None, 'logo.png': None})), [])
+
+        self.assertTrue(os.path.exists(self.path + '.gz'))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'logo.png.gz')))
+        with open(os.path.join(self.dir, 'precompressed.json')) as f:
+            self.assertEqual(list(json.load(f)), ['main.css'])
+
+    def test_dry_run(self):
+        """post_process should not compress anything during a dry run."""
+        files = storage.PrecompressedStaticFilesStorage(location=self.dir, base_url='/static/')
+
+        list(files.post_process({'main.css': None}, dry_run=True))
+
+        self.assertFalse(os.path.exists(self.path + '.gz'))
+
+
+class ManifestStaticFilesStorageTests(StorageTestCase):
+    def setUp(self):
+        super(ManifestStaticFilesStorageTests, self).setUp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        for name, contents in [('css/main.css', 'body { background: url("../img/logo.png"); }\n' * 20),
+                ('img/logo.png', 'PNG' * 200)]:
+            os.makedirs(os.path.join(self.source, os.path.dirname(name)))
+            with open(os.path.join(self.source, name), 'w') as f:
+                f.write(contents)
+        self.paths = dict((name, (FileSystemStorage(location=self.source), name))
+            for name in ('css/main.css', 'img/logo.png'))
+        for name in self.paths:
+            os.makedirs(os.path.join(self.dir, os.path.dirname(name)))
+            shutil.copy(os.path.join(self.source, name), os.path.join(self.dir, name))
+
+        debug = override_settings(DEBUG=False)
+        debug.enable()
+        self.addCleanup(debug.disable)
+
+    def collect(self, storage_class=storage.ManifestStaticFilesStorage):
+        files = storage_class(location=self.dir, base_url='/static/')
+        return files, dict((name, hashed_name) for name, hashed_name, processed
+            in files.post_process(self.paths))
+
+    def test_post_process(self):
+        """post_process should save hashed copies, with CSS pointing to the hashed names."""
+        files, hashed = self.collect()
+
+        self.assertRegexpMatches(hashed['img/logo.png'], r'^img/logo\.[0-9a-f]{12}\.png$')
+        with open(os.path.join(self.dir, hashed['css/main.css'])) as f:
+            self.assertIn('url("../%s")' % hashed['img/logo.png'], f.read())
+        with open(os.path.join(self.dir, 'staticfiles.json')) as f:
+            self.assertEqual(json.load(f)['paths'], hashed)
+
+    def test_url_reads_manifest(self):
+        """url should look the hashed name up in the manifest without opening the file."""
+        files, hashed = self.collect()
+        files = storage.ManifestStaticFilesStorage(location=self.dir, base_url='/static/')
+
+        with mock.patch.object(files, 'hashed_name') as hashed_name:
+            self.assertEqual(files.url('img/logo.png'), '/static/' + hashed['img/logo.png'])
+        self.assertFalse(hashed_name.called)
+
+    def test_url_in_debug(self):
+        """url should link to the file itself while DEBUG is on."""
+        files, hashed = self.collect()
+
+        with override_settings(DEBUG=True):
+            self.assertEqual(files.url('img/logo.png'), '/static/img/logo.png')
+
+    def test_precompresses_hashed_copies(self):
+        """HashedStaticFilesStorage should precompress the hashed copies too."""
+        files, hashed = self.collect(storage.HashedStaticFilesStorage)
+
+        self.assertTrue(os.path.exists(os.path.join(self.dir, hashed['css/main.css'] + '.gz')))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'css/main.css.gz')))
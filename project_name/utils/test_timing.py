@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+
+from .middleware.timing import RequestTimer, _local
+from . import timing
+
+
+class SpanTests(unittest.TestCase):
+    def setUp(self):
+        self.timer = _local.timer = RequestTimer()
+
+    def tearDown(self):
+        _local.timer = None
+
+    def test_context_manager(self):
+        """span should add the time spent in a with block to the current request."""
+        with timing.span('search'):
+            pass
+
+        self.assertEqual(list(self.timer.spans), ['search'])
+        self.assertEqual(self.timer.spans['search'][1], 1)
+
+    def test_decorator(self):
+        """span should add the time spent in a decorated function to the current request."""
+        @timing.span('lookup', 'GeoIP lookup')
+        def lookup():
+            return 'result'
+
+        self.assertEqual(lookup(), 'result')
+        self.assertEqual(lookup(), 'result')
+        self.assertEqual(self.timer.spans['lookup'][1:], [2, 'GeoIP lookup'])
+
+    def test_records_spans_on_exceptions(self):
+        """span should record the time spent even when the block raises an exception."""
+        def fail():
+            with timing.span('fail'):
+                raise ValueError
+
+        self.assertRaises(ValueError, fail)
+        self.assertTrue('fail' in self.timer.spans)
+
+    def test_outside_of_requests(self):
+        """span should do nothing outside of requests."""
+        _local.timer = None
+        with timing.span('search'):
+            pass
+
+        self.assertEqual(self.timer.spans, {})
+
+
+class ServerTimingTests(unittest.TestCase):
+    def test_server_timing(self):
+        """RequestTimer.server_timing should list the request timings and the spans."""
+        timer = RequestTimer()
+        timer.add_span('search', 0.0123)
+        timer.add_span('cache', 0.001)
+        timer.add_span('cache', 0.002)
+        timer.add_span('geo ip', 0.005, 'GeoIP "lookup"')
+        timer.stop()
+        timer.wall_time, timer.cpu_time = 0.1, 0.05
+
+        self.assertEqual(timer.server_timing(), 'total;dur=100.0, cpu;dur=50.0, '
+            'sql;dur=0.0;desc="0 queries", tpl;dur=0.0;desc="0 templates", '
+            'search;dur=12.3, cache;dur=3.0;desc="2 calls", '
+            'geo_ip;dur=5.0;desc="GeoIP \\"lookup\\""')
+        self.assertEqual(timer.as_dict()['spans'], {'search': 12.3, 'cache': 3.0, 'geo ip': 5.0})
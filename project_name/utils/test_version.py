@@ -0,0 +1,37 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import shutil
+import tempfile
+
+from .version import git_revision
+
+
+class GitRevisionTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.dir, '.git', 'refs', 'heads'))
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, contents):
+        with open(os.path.join(self.dir, '.git', name), 'w') as f:
+            f.write(contents)
+
+    def test_branch(self):
+        """git_revision should return the commit of the checked out branch."""
+        self.write('HEAD', 'ref: refs/heads/master\n')
+        self.write('refs/heads/master', 'a' * 40 + '\n')
+
+        self.assertEqual(git_revision(self.dir), 'a' * 40)
+
+    def test_packed_refs(self):
+        """git_revision should find branches in packed-refs."""
+        self.write('HEAD', 'ref: refs/heads/master\n')
+        self.write('packed-refs', '# pack-refs with: peeled\n%s refs/heads/master\n' % ('b' * 40))
+
+        self.assertEqual(git_revision(self.dir), 'b' * 40)
+
+    def test_not_a_repository(self):
+        """git_revision should return None outside of a git repository."""
+        self.assertEqual(git_revision(os.path.join(self.dir, 'missing')), None)
@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import mock
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import router
+from django.http import HttpRequest
+from django.test import TestCase
+
+from .db.routers import ReplicaRouter, use_replica
+
+try:
+    from waffle.models import Flag, Sample, Switch
+    from . import waffle
+except ImportError:
+    waffle = None
+
+
+@unittest.skipUnless(waffle, 'django-waffle is not installed')
+class WaffleSnapshotTests(TestCase):
+    def setUp(self):
+        waffle.install()
+        waffle.invalidate()
+
+    def request(self, user=None):
+        request = HttpRequest()
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_loads_everything_at_once(self):
+        """get_snapshot should load every flag, switch and sample in one go."""
+        Flag.objects.create(name='flag', everyone=True)
+        Switch.objects.create(name='switch', active=True)
+        Sample.objects.create(name='sample', percent='100.0')
+        waffle.get_snapshot()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(waffle.flag_is_active(self.request(), 'flag'))
+            self.assertFalse(waffle.flag_is_active(self.request(), 'missing'))
+            self.assertTrue(waffle.switch_is_active('switch'))
+            self.assertTrue(waffle.sample_is_active('sample'))
+
+    def test_reloads_on_changes(self):
+        """Changing a flag, switch or sample should reload the snapshot."""
+        switch = Switch.objects.create(name='switch', active=True)
+        self.assertTrue(waffle.switch_is_active('switch'))
+        switch.active = False
+        switch.save()
+
+        self.assertFalse(waffle.switch_is_active('switch'))
+
+    def test_loads_from_primary(self):
+        """get_snapshot should read from the primary during read-only requests."""
+        Switch.objects.create(name='switch', active=True)
+        waffle.invalidate()
+        use_replica('replica')
+        self.addCleanup(use_replica, None)
+
+        # Reading from the missing 'replica' database would raise an error.
+        with mock.patch.object(router, 'routers', [ReplicaRouter()]):
+            self.assertTrue(waffle.get_snapshot().switches['switch'])
+
+    def test_flag_users(self):
+        """flag_is_active should be true for the users of the flag."""
+        user = User.objects.create(username='user')
+        flag = Flag.objects.create(name='flag')
+        flag.users.add(user)
+
+        self.assertTrue(waffle.flag_is_active(self.request(user), 'flag'))
+        self.assertFalse(waffle.flag_is_active(self.request(), 'flag'))
+
+    def test_memoized_per_request(self):
+        """flag_is_active should remember the answer for the rest of the request."""
+        flag = Flag.objects.create(name='flag', everyone=True)
+        request = self.request()
+        self.assertTrue(waffle.flag_is_active(request, 'flag'))
+        flag.everyone = False
+        flag.save()
+
+        self.assertTrue(waffle.flag_is_active(request, 'flag'))
+        self.assertFalse(waffle.flag_is_active(self.request(), 'flag'))
+
+    def test_replaces_waffle_functions(self):
+        """install should replace the functions in the waffle package."""
+        import waffle as waffle_package
+
+        self.assertEqual(waffle_package.flag_is_active, waffle.flag_is_active)
@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+from django.utils import unittest
+import os
+import shutil
+import tempfile
+
+import mock
+from django.conf.urls.defaults import patterns, url, include
+from django.http import HttpResponse
+from django.test.utils import override_settings
+
+from . import warmup
+
+
+def tag(contents):
+    """Returns a template tag, built up so startproject doesn't render it."""
+    return '{' + '%% %s %%' % contents + '}'
+
+
+def view(request, *args):
+    return HttpResponse()
+
+
+nested = patterns('',
+    url(r'^c/$', view, name='c'),
+)
+
+urlpatterns = patterns('',
+    url(r'^a/$', view, name='a'),
+    url(r'^b/(\d+)/$', view, name='b'),
+    url(r'^nested/', include(nested, namespace='nested')),
+)
+
+
+class WarmupTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.dir, 'app'))
+        for name, content in (('base.html', tag('block content') + tag('endblock')),
+                              ('app/page.html', tag('extends "base.html"')),
+                              ('app/broken.html', tag('broken')),
+                              ('app/notes.md', 'not a template')):
+            with open(os.path.join(self.dir, name), 'w') as f:
+                f.write(content)
+
+        self.settings = override_settings(ROOT_URLCONF=__name__, TEMPLATE_DIRS=(self.dir,))
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.dir)
+
+    def test_url_names(self):
+        """url_names should list every named URL pattern, including namespaced ones."""
+        from django.core.urlresolvers import get_resolver
+
+        self.assertEqual(sorted(warmup.url_names(get_resolver(None))), ['a', 'b', 'nested:c'])
+
+    def test_warmup_templates(self):
+        """warmup_templates should compile the templates in TEMPLATE_DIRS and skip broken ones."""
+        with mock.patch.object(warmup, 'logger') as logger:
+            self.assertEqual(warmup.warmup_templates(), 2)
+
+        self.assertEqual(logger.warning.call_count, 1)
+
+    def test_warmup(self):
+        """warmup should log how long it took."""
+        with mock.patch.object(warmup, 'logger') as logger:
+            timings = warmup.warmup()
+
+        self.assertEqual(sorted(timings), ['templates_ms', 'total_ms', 'translations_ms', 'urls_ms'])
+        self.assertEqual(logger.info.call_args[0][1:3], (3, 2))
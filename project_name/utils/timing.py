@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+
+import time
+from functools import wraps
+
+from .middleware.timing import get_timer
+
+
+class Span(object):
+    """
+    Times a block of code and adds it to the timings of the current request.
+
+    Use it through `span`. Outside of a request, or when TimingMiddleware
+    isn't installed, the time is thrown away.
+    """
+    def __init__(self, name, description=None):
+        self.name = name
+        self.description = description
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        timer = get_timer()
+        if timer is not None:
+            timer.add_span(self.name, time.time() - self.start, self.description)
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Span(self.name, self.description):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def span(name, description=None):
+    """
+    Time part of a request as `name`. The total time of every span with the
+    same name ends up in the Server-Timing header and in the `spans` of the
+    request's timing log record. It works as a context manager:
+
+    with timing.span('search'):
+        results = index.search(query)
+
+    or as a decorator:
+
+    @timing.span('geoip', 'GeoIP lookup')
+    def lookup(ip):
+        ...
+
+    Names should be short tokens, anything other than letters, digits and
+    a few punctuation characters is replaced with an underscore.
+    """
+    return Span(name, description)
@@ -0,0 +1,23 @@
+from __future__ import absolute_import
+
+
+def transactional(view):
+    """
+    Run the view in a transaction, committed when it returns a response and
+    rolled back when it raises an exception.
+
+    Only needed for views that handle safe methods like GET, requests with
+    other methods get a transaction anyway.
+    """
+    view.transactional = True
+    return view
+
+
+def not_transactional(view):
+    """
+    Run the view in autocommit mode, even for requests with methods like POST
+    that would get a transaction otherwise. Its reads still go to the primary
+    database.
+    """
+    view.transactional = False
+    return view
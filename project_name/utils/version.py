@@ -0,0 +1,30 @@
+import os
+
+
+def git_revision(path):
+    """
+    Returns the commit checked out in the git repository at `path`, or None
+    if it isn't one. Reads the files in .git instead of running git, since
+    every process imports the settings.
+    """
+    git_dir = os.path.join(path, '.git')
+    try:
+        with open(os.path.join(git_dir, 'HEAD')) as f:
+            head = f.read().strip()
+        if not head.startswith('ref: '):
+            # A detached HEAD holds the commit itself.
+            return head
+        ref = head[len('ref: '):]
+
+        ref_path = os.path.join(git_dir, *ref.split('/'))
+        if os.path.exists(ref_path):
+            with open(ref_path) as f:
+                return f.read().strip()
+
+        with open(os.path.join(git_dir, 'packed-refs')) as f:
+            for line in f:
+                if line.rstrip('\n').endswith(' ' + ref):
+                    return line.split(' ', 1)[0]
+    except IOError:
+        pass
+    return None
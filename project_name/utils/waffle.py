@@ -0,0 +1,238 @@
+from __future__ import absolute_import
+
+import time
+import random
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils.importlib import import_module
+
+from waffle.models import Flag, Sample, Switch
+
+
+# Bumped whenever a flag, switch or sample changes, so every process
+# reloads them.
+VERSION_CACHE_KEY = 'waffle:snapshot-version'
+VERSION_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+
+# The modules that import the waffle functions by name.
+WAFFLE_MODULES = (
+    'waffle',
+    'waffle.decorators',
+    'waffle.templatetags.waffle_tags',
+    'waffle.views',
+    'waffle.helpers',
+)
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class Snapshot(object):
+    """
+    Every flag, switch and sample, loaded with one query per table.
+
+    The users and groups of each flag are kept as sets of ids on the flag,
+    as `user_ids` and `group_ids`.
+
+    Everything is read from the primary database. A snapshot read from a
+    lagging replica would be kept under the new version and never reloaded.
+    """
+    def __init__(self, version):
+        self.version = version
+        self.checked = time.time()
+        db = DEFAULT_DB_ALIAS
+
+        self.flags = dict((flag.name, flag) for flag in Flag.objects.using(db))
+        flags_by_id = {}
+        for flag in self.flags.itervalues():
+            flag.user_ids = set()
+            flag.group_ids = set()
+            flags_by_id[flag.id] = flag
+        for flag_id, user_id in Flag.users.through.objects.using(db).values_list('flag_id', 'user_id'):
+            flags_by_id[flag_id].user_ids.add(user_id)
+        for flag_id, group_id in Flag.groups.through.objects.using(db).values_list('flag_id', 'group_id'):
+            flags_by_id[flag_id].group_ids.add(group_id)
+
+        self.switches = dict(Switch.objects.using(db).values_list('name', 'active'))
+        self.samples = dict(Sample.objects.using(db).values_list('name', 'percent'))
+
+
+def get_version():
+    return cache.get(VERSION_CACHE_KEY)
+
+
+def get_snapshot():
+    """
+    Returns the snapshot of this process.
+
+    The snapshot is used for up to WAFFLE_SNAPSHOT_TIMEOUT seconds. After
+    that the version key in the cache is checked and the snapshot is only
+    reloaded when the version changed. Without a shared cache it's reloaded
+    every WAFFLE_SNAPSHOT_TIMEOUT seconds.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    now = time.time()
+    if snapshot is not None and now - snapshot.checked < getattr(settings, 'WAFFLE_SNAPSHOT_TIMEOUT', 10):
+        return snapshot
+
+    version = get_version()
+    if snapshot is not None and version is not None and version == snapshot.version:
+        snapshot.checked = now
+        return snapshot
+
+    with _lock:
+        if _snapshot is snapshot:
+            _snapshot = Snapshot(version)
+        return _snapshot
+
+
+def invalidate(**kwargs):
+    """Make every process reload the flags, switches and samples."""
+    global _snapshot
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, int(time.time() * 1000), VERSION_CACHE_TIMEOUT)
+    _snapshot = None
+
+
+def get_request_snapshot(request):
+    """Returns the snapshot used for the whole of `request`."""
+    snapshot = request.__dict__.get('_waffle_snapshot')
+    if snapshot is None:
+        snapshot = request._waffle_snapshot = get_snapshot()
+    return snapshot
+
+
+def get_group_ids(request):
+    group_ids = request.__dict__.get('_waffle_group_ids')
+    if group_ids is None:
+        group_ids = request._waffle_group_ids = set(
+            request.user.groups.values_list('id', flat=True))
+    return group_ids
+
+
+def set_flag(request, flag_name, active=True, session_only=False):
+    """Remember the flag so WaffleMiddleware sets its cookie."""
+    if not hasattr(request, 'waffles'):
+        request.waffles = {}
+    request.waffles[flag_name] = [active, session_only]
+
+
+def _flag_is_active(request, flag_name):
+    flag = get_request_snapshot(request).flags.get(flag_name)
+    if flag is None:
+        return getattr(settings, 'WAFFLE_FLAG_DEFAULT', False)
+
+    if getattr(settings, 'WAFFLE_OVERRIDE', False):
+        if flag_name in request.GET:
+            return request.GET[flag_name] == '1'
+
+    if flag.everyone:
+        return True
+    elif flag.everyone is False:
+        return False
+
+    if flag.testing:
+        tc = getattr(settings, 'WAFFLE_TESTING_COOKIE', 'dwft_%s') % flag_name
+        if tc in request.GET:
+            on = request.GET[tc] == '1'
+            if not hasattr(request, 'waffle_tests'):
+                request.waffle_tests = {}
+            request.waffle_tests[flag_name] = on
+            return on
+        if tc in request.COOKIES:
+            return request.COOKIES[tc] == 'True'
+
+    user = request.user
+    if flag.authenticated and user.is_authenticated():
+        return True
+    if flag.staff and user.is_staff:
+        return True
+    if flag.superusers and user.is_superuser:
+        return True
+
+    languages = getattr(flag, 'languages', None)
+    if languages and getattr(request, 'LANGUAGE_CODE', None) in languages.split(','):
+        return True
+
+    if user.id in flag.user_ids:
+        return True
+    if flag.group_ids and user.id is not None and flag.group_ids & get_group_ids(request):
+        return True
+
+    if flag.percent > 0:
+        if hasattr(request, 'waffles') and flag_name in request.waffles:
+            return request.waffles[flag_name][0]
+
+        cookie = getattr(settings, 'WAFFLE_COOKIE', 'dwf_%s') % flag_name
+        if cookie in request.COOKIES:
+            active = request.COOKIES[cookie] == 'True'
+        else:
+            active = Decimal(str(random.uniform(0, 100))) <= flag.percent
+        set_flag(request, flag_name, active, flag.rollout)
+        return active
+
+    return False
+
+
+def flag_is_active(request, flag_name):
+    """
+    Same as waffle.flag_is_active, but the flag comes from the snapshot and
+    the answer is remembered for the rest of the request.
+    """
+    flags = request.__dict__.setdefault('_waffle_flags', {})
+    try:
+        return flags[flag_name]
+    except KeyError:
+        active = flags[flag_name] = _flag_is_active(request, flag_name)
+        return active
+
+
+def switch_is_active(switch_name):
+    """Same as waffle.switch_is_active, but the switch comes from the snapshot."""
+    return get_snapshot().switches.get(switch_name,
+        getattr(settings, 'WAFFLE_SWITCH_DEFAULT', False))
+
+
+def sample_is_active(sample_name):
+    """Same as waffle.sample_is_active, but the sample comes from the snapshot."""
+    percent = get_snapshot().samples.get(sample_name)
+    if percent is None:
+        return getattr(settings, 'WAFFLE_SAMPLE_DEFAULT', False)
+    return Decimal(str(random.uniform(0, 100))) <= percent
+
+
+def install():
+    """
+    Replace the waffle functions with the ones above, everywhere waffle
+    uses them, and reload the snapshot whenever a flag, switch or sample
+    is changed.
+
+    Call this once the settings are loaded, for example in urls.py.
+    """
+    functions = {
+        'flag_is_active': flag_is_active,
+        'switch_is_active': switch_is_active,
+        'sample_is_active': sample_is_active,
+    }
+    for name in WAFFLE_MODULES:
+        try:
+            module = import_module(name)
+        except ImportError:
+            continue
+        for attr, fn in functions.iteritems():
+            if hasattr(module, attr):
+                setattr(module, attr, fn)
+
+    for model in (Flag, Switch, Sample):
+        post_save.connect(invalidate, sender=model, dispatch_uid='waffle_snapshot')
+        post_delete.connect(invalidate, sender=model, dispatch_uid='waffle_snapshot')
+    for through in (Flag.users.through, Flag.groups.through):
+        m2m_changed.connect(invalidate, sender=through, dispatch_uid='waffle_snapshot')
@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+
+import os
+import time
+import logging
+
+from django.conf import settings
+from django.core.urlresolvers import get_resolver, reverse, NoReverseMatch
+from django.template.loader import get_template
+from django.utils import translation
+
+
+logger = logging.getLogger(__name__)
+
+# The files in template directories that are compiled.
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def url_names(resolver, namespace=''):
+    """Yields the names of the URL patterns of `resolver`, including namespaced ones."""
+    for key in resolver.reverse_dict.keys():
+        if isinstance(key, basestring):
+            yield namespace + key
+    for name, (prefix, sub_resolver) in resolver.namespace_dict.items():
+        for url_name in url_names(sub_resolver, '%s%s:' % (namespace, name)):
+            yield url_name
+
+
+def warmup_urls():
+    """
+    Imports the URLconf, which runs admin.autodiscover() and anything else
+    in urls.py, and fills the reverse lookup tables by reversing every named
+    URL. Returns the number of names.
+    """
+    resolver = get_resolver(None)
+    resolver.url_patterns
+    names = set(url_names(resolver))
+    for name in names:
+        try:
+            reverse(name)
+        except NoReverseMatch:
+            # Patterns with arguments still fill the lookup tables.
+            pass
+    return len(names)
+
+
+def template_files(extensions, template_dirs=None):
+    """
+    Yields the path and name of each template in `template_dirs`, which
+    defaults to TEMPLATE_DIRS.
+    """
+    if template_dirs is None:
+        template_dirs = settings.TEMPLATE_DIRS
+    for template_dir in template_dirs:
+        for root, dirs, files in os.walk(template_dir):
+            for filename in files:
+                if os.path.splitext(filename)[1] in extensions:
+                    path = os.path.join(root, filename)
+                    yield path, os.path.relpath(path, template_dir).replace(os.sep, '/')
+
+
+def template_names(extensions):
+    """Yields the names of the templates in TEMPLATE_DIRS."""
+    for path, name in template_files(extensions):
+        yield name
+
+
+def warmup_templates(extensions=TEMPLATE_EXTENSIONS):
+    """
+    Compiles every template in TEMPLATE_DIRS, which imports the template tag
+    libraries they load. With the cached template loader the compiled
+    templates are kept too. Returns the number of templates compiled.
+    """
+    count = 0
+    for name in template_names(extensions):
+        try:
+            get_template(name)
+        except Exception:
+            logger.warning('Could not compile template %s during warmup.', name, exc_info=True)
+        else:
+            count += 1
+    return count
+
+
+def warmup():
+    """
+    Does the work the first requests to a new worker would otherwise pay
+    for: imports the URLconf, reverses every named URL, loads the
+    translations and compiles every template in TEMPLATE_DIRS.
+
+    Logs and returns how long each step took in milliseconds.
+    """
+    timings = {}
+    start = time.time()
+
+    translation.activate(settings.LANGUAGE_CODE)
+    timings['translations_ms'] = (time.time() - start) * 1000
+
+    step = time.time()
+    urls = warmup_urls()
+    timings['urls_ms'] = (time.time() - step) * 1000
+
+    step = time.time()
+    templates = warmup_templates()
+    timings['templates_ms'] = (time.time() - step) * 1000
+
+    translation.deactivate()
+    timings['total_ms'] = (time.time() - start) * 1000
+
+    logger.info('Warmed up %d URL names and %d templates in %.0fms',
+        urls, templates, timings['total_ms'],
+        extra={'timing': timings, 'pid': os.getpid()})
+    return timings
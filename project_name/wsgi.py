@@ -24,6 +24,13 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE",
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
+# Do the work of the first requests before the worker serves any, see the
+# WSGI_WARMUP setting.
+from django.conf import settings
+if getattr(settings, 'WSGI_WARMUP', False):
+    from {{ project_name }}.utils.warmup import warmup
+    warmup()
+
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)